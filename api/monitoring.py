@@ -0,0 +1,56 @@
+__all__ = (
+    'router',
+)
+
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from config import APP_SETTINGS
+from config.db import db_helper
+from config.redis import cache
+
+monitoring_bearer = HTTPBearer(auto_error=False)
+
+
+def verify_monitoring_token(credentials: HTTPAuthorizationCredentials = Depends(monitoring_bearer)):
+    """
+    Admits scrapers presenting MONITORING_TOKEN, which is separate from user JWTs,
+    so metrics can be collected in production without a user account.
+    """
+    if credentials is None or not secrets.compare_digest(
+            credentials.credentials.encode(), APP_SETTINGS.MONITORING_TOKEN.encode(),
+    ):
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+
+
+# Registered only with APP_SETTINGS.MONITORING_ENABLED (see api/routers.py)
+router = APIRouter(prefix='/monitoring', tags=['monitoring'], dependencies=[Depends(verify_monitoring_token)])
+
+
+@router.get('/db/pool')
+async def db_pool_metrics():
+    return db_helper.pool_metrics()
+
+
+def get_profiler():
+    if db_helper.profiler is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail='Query profiler is disabled')
+    return db_helper.profiler
+
+
+@router.get('/db/queries')
+async def db_query_report():
+    return get_profiler().report()
+
+
+@router.delete('/db/queries')
+async def db_query_reset():
+    get_profiler().reset()
+    return {'detail': 'Query profiler reset'}
+
+
+@router.get('/cache')
+async def cache_metrics():
+    return cache.stats()
@@ -1,7 +1,12 @@
+from config import APP_SETTINGS
 from utils.routes import Routes
+from .monitoring import router as monitoring_router
 
 __routes__ = Routes(
-    routers=()
+    routers=(
+        # Pool, query and cache metrics reveal SQL and traffic patterns: opt-in, behind their own token
+        *((monitoring_router,) if APP_SETTINGS.MONITORING_ENABLED else ()),
+    )
 )
 
 __ws_routes__ = Routes(
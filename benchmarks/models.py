@@ -0,0 +1,49 @@
+"""
+Table and database setup shared by the repository benchmarks.
+"""
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.orm import Mapped, mapped_column
+
+from config.db import DatabaseHelper
+from models import BaseModel
+
+SQLITE_URL = 'sqlite+aiosqlite://'
+
+
+class BenchmarkItem(BaseModel):
+    __tablename__ = 'benchmark_items'
+
+    name: Mapped[str] = mapped_column(sa.String(100))
+    price: Mapped[float] = mapped_column(sa.Float())
+    description: Mapped[Optional[str]] = mapped_column(sa.Text(), nullable=True)
+
+
+def item_rows(count: int) -> list[dict]:
+    return [
+        {'name': f'Item {index}', 'price': index * 0.5, 'description': 'An ordinary benchmark row. ' * 4}
+        for index in range(count)
+    ]
+
+
+@asynccontextmanager
+async def benchmark_database(url: Optional[str] = None):
+    """
+    Points `BenchmarkItem.repo` at a fresh `benchmark_items` table of `url` (in-memory SQLite
+    by default) and drops the table afterwards.
+    """
+    helper = DatabaseHelper(url or SQLITE_URL, echo=False)
+    table = BenchmarkItem.__table__
+    previous, BenchmarkItem.repo.db_helper = BenchmarkItem.repo.db_helper, helper
+    async with helper.engine.begin() as connection:
+        await connection.run_sync(lambda sync_connection: table.drop(sync_connection, checkfirst=True))
+        await connection.run_sync(table.create)
+    try:
+        yield helper
+    finally:
+        async with helper.engine.begin() as connection:
+            await connection.run_sync(table.drop)
+        BenchmarkItem.repo.db_helper = previous
+        await helper.engine.dispose()
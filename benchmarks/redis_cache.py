@@ -0,0 +1,48 @@
+"""
+Compares N sequential `cache.get` calls with one `cache.get_many` against the Redis
+configured in the environment (the near cache is bypassed)::
+
+    python -m benchmarks.redis_cache
+"""
+import asyncio
+import statistics
+import time
+
+from config.redis import cache
+
+SIZES = (10, 100, 1000)
+ROUNDS = 20
+KEY_PREFIX = 'benchmark:redis_cache'
+
+
+async def _timed(coroutine_function) -> float:
+    start = time.perf_counter()
+    await coroutine_function()
+    return (time.perf_counter() - start) * 1000
+
+
+async def run():
+    await cache.connect()
+    try:
+        print(f"{'N':>6} {'N x get (ms)':>14} {'get_many (ms)':>14} {'speedup':>8}")
+        for size in SIZES:
+            keys = [f'{KEY_PREFIX}:{index}' for index in range(size)]
+            await cache.set_many({key: {'id': index, 'name': f'item {index}'} for index, key in enumerate(keys)}, expire=60)
+
+            async def single():
+                for key in keys:
+                    await cache.get(key, near_ttl=0)
+
+            async def batched():
+                await cache.get_many(keys, near_ttl=0)
+
+            single_ms = statistics.median([await _timed(single) for _ in range(ROUNDS)])
+            batched_ms = statistics.median([await _timed(batched) for _ in range(ROUNDS)])
+            print(f'{size:>6} {single_ms:>14.2f} {batched_ms:>14.2f} {single_ms / batched_ms:>7.1f}x')
+            await cache.delete_many(keys)
+    finally:
+        await cache.disconnect()
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+"""
+Compares cache serializers (codec and compression) on typical payloads: encode and
+decode throughput, and stored size against the former plain JSON format. With `--redis`
+it also stores each value in the configured Redis and reports `MEMORY USAGE`::
+
+    python -m benchmarks.redis_codecs [--redis]
+"""
+import asyncio
+import json
+import sys
+import time
+
+from config.redis import CacheSerializer, CODECS, COMPRESSORS, cache
+
+ROUNDS = 200
+KEY_PREFIX = 'benchmark:redis_codecs'
+
+PAYLOADS = {
+    'small dict': {'id': 1, 'name': 'Product', 'price': 12.5, 'active': True},
+    'page of 100': [
+        {'id': index, 'name': f'Product {index}', 'description': 'A fairly ordinary product. ' * 4, 'price': index * 1.5}
+        for index in range(100)
+    ],
+    'counts': {f'category:{index}': index * 7 for index in range(1000)},
+}
+
+
+def _serializers() -> dict[str, CacheSerializer]:
+    serializers = {}
+    for codec in ('json', 'msgpack', 'pickle'):
+        for compression in (None, 'zlib', 'zstd', 'lz4'):
+            if CODECS[codec].available and (compression is None or COMPRESSORS[compression].available):
+                serializers[f"{codec}+{compression or 'none'}"] = CacheSerializer(codec, compression=compression)
+    return serializers
+
+
+def _per_second(function, value) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        function(value)
+    return ROUNDS / (time.perf_counter() - start)
+
+
+async def _memory_usage(key: str, value: bytes) -> int:
+    await cache.client.set(key, value, ex=60)
+    return await cache.client.memory_usage(key, samples=0)
+
+
+async def run(measure_redis: bool):
+    if measure_redis:
+        await cache.connect()
+    try:
+        for name, payload in PAYLOADS.items():
+            legacy = json.dumps(payload).encode()
+            legacy_memory = await _memory_usage(f'{KEY_PREFIX}:legacy', legacy) if measure_redis else None
+            print(f'\n{name}: legacy JSON {len(legacy)} B' + (f', {legacy_memory} B in Redis' if measure_redis else ''))
+            print(f"{'serializer':>16} {'encode/s':>10} {'decode/s':>10} {'size':>8} {'saved':>7}" + (f" {'redis':>8}" if measure_redis else ''))
+            for label, serializer in _serializers().items():
+                data = serializer.dumps(payload)
+                line = (
+                    f'{label:>16} {_per_second(serializer.dumps, payload):>10.0f} '
+                    f'{_per_second(serializer.loads, data):>10.0f} {len(data):>8} {1 - len(data) / len(legacy):>7.1%}'
+                )
+                if measure_redis:
+                    line += f' {await _memory_usage(f"{KEY_PREFIX}:{label}", data):>8}'
+                print(line)
+    finally:
+        if measure_redis:
+            await cache.client.delete(*[f'{KEY_PREFIX}:{label}' for label in ('legacy', *_serializers())])
+            await cache.disconnect()
+
+
+if __name__ == '__main__':
+    asyncio.run(run('--redis' in sys.argv))
@@ -0,0 +1,73 @@
+"""
+Measures the per-call cost of `get(id=...)` on in-memory SQLite with the repository's
+statement cache and SQLAlchemy's compiled cache cold (cleared before every call) and
+warm, both for building the statement alone and for the whole query::
+
+    python -m benchmarks.repo_statements
+"""
+import asyncio
+import statistics
+import time
+
+from .models import BenchmarkItem, benchmark_database, item_rows
+
+CALLS = 2000
+
+
+def _clear_statement_caches(helper):
+    repo = BenchmarkItem.repo
+    repo._statements.clear()
+    repo._lookup_plans.clear()
+    repo._load_options.clear()
+    helper.engine.sync_engine._compiled_cache.clear()
+
+
+def _build_statement(helper):
+    repo = BenchmarkItem.repo
+    load = repo.load_spec(None)
+    stmt = repo.cached_statement(
+        ('get', load), {'id': 1},
+        lambda conditions: repo.select().filter(*conditions).options(*repo.load_options(load)),
+    )
+    return stmt.compile(dialect=helper.engine.dialect)
+
+
+async def _per_call_us(function, calls: int = CALLS) -> float:
+    timings = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await function()
+        timings.append((time.perf_counter() - start) * 1_000_000)
+    return statistics.median(timings)
+
+
+async def run():
+    async with benchmark_database() as helper:
+        await BenchmarkItem.repo.bulk_insert(item_rows(100))
+        repo = BenchmarkItem.repo
+
+        async def build_cold():
+            _clear_statement_caches(helper)
+            _build_statement(helper)
+
+        async def build_warm():
+            repo.cached_statement(('get', repo.load_spec(None)), {'id': 1}, None)
+
+        async def get_cold():
+            _clear_statement_caches(helper)
+            await repo._with_read_session(repo.db_get, id=1)
+
+        async def get_warm():
+            await repo._with_read_session(repo.db_get, id=1)
+
+        # Fills the caches for the warm runs
+        _build_statement(helper)
+        await get_warm()
+
+        print(f"{'':>24} {'cold (us)':>10} {'warm (us)':>10}")
+        print(f"{'statement construction':>24} {await _per_call_us(build_cold):>10.1f} {await _per_call_us(build_warm):>10.1f}")
+        print(f"{'get(id=...) end to end':>24} {await _per_call_us(get_cold):>10.1f} {await _per_call_us(get_warm):>10.1f}")
+
+
+if __name__ == '__main__':
+    asyncio.run(run())
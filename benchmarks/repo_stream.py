@@ -0,0 +1,91 @@
+"""
+Compares the peak memory (`ru_maxrss`) of reading a 1M-row table with `get_all()`, which
+loads every instance at once, against `stream_batches()`, which holds one batch at a time.
+The peak is per process, so each method reads in its own child process, from a SQLite
+file (or the database at `--url`) seeded once beforehand::
+
+    python -m benchmarks.repo_stream [--rows 1000000] [--url postgresql+asyncpg://...]
+"""
+import argparse
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from config.db import DatabaseHelper
+from .models import BenchmarkItem, benchmark_database
+
+ROWS = 1_000_000
+BATCH_SIZE = 1000
+
+
+def _max_rss_mb() -> float:
+    # Kilobytes on Linux, bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def _rows(count: int):
+    for index in range(count):
+        yield {'name': f'Item {index}', 'price': index * 0.5, 'description': 'An ordinary benchmark row. ' * 4}
+
+
+async def _get_all() -> int:
+    return len(await BenchmarkItem.repo.get_all())
+
+
+async def _stream_batches() -> int:
+    count = 0
+    async for batch in BenchmarkItem.repo.stream_batches(size=BATCH_SIZE):
+        count += len(batch)
+    return count
+
+
+METHODS = {
+    'get_all': _get_all,
+    'stream_batches': _stream_batches,
+}
+
+
+async def read(method: str, url: str):
+    """
+    Runs in the child process: reads the seeded table with `method` and prints its peak memory.
+    """
+    helper = DatabaseHelper(url, echo=False)
+    BenchmarkItem.repo.db_helper = helper
+    try:
+        before = _max_rss_mb()
+        start = time.perf_counter()
+        count = await METHODS[method]()
+        elapsed = time.perf_counter() - start
+        print(f'{method:>16} {count:>9} {elapsed:>8.1f} {before:>10.0f} {_max_rss_mb():>10.0f}')
+    finally:
+        await helper.engine.dispose()
+
+
+async def run(rows: int, url: str = None):
+    with tempfile.TemporaryDirectory() as directory:
+        url = url or f'sqlite+aiosqlite:///{os.path.join(directory, "benchmark.db")}'
+        async with benchmark_database(url):
+            await BenchmarkItem.repo.bulk_insert(_rows(rows))
+            print(f"{'method':>16} {'rows':>9} {'seconds':>8} {'base (MB)':>10} {'peak (MB)':>10}")
+            for method in METHODS:
+                subprocess.run(
+                    [sys.executable, '-m', 'benchmarks.repo_stream', '--read', method, '--url', url],
+                    check=True,
+                )
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=ROWS)
+    parser.add_argument('--url', help='Database URL; a temporary SQLite file by default')
+    parser.add_argument('--read', choices=METHODS, help=argparse.SUPPRESS)
+    arguments = parser.parse_args()
+    if arguments.read:
+        asyncio.run(read(arguments.read, arguments.url))
+    else:
+        asyncio.run(run(arguments.rows, arguments.url))
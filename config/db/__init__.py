@@ -1,3 +1,10 @@
+from .deadline import *
 from .engine import *
+from .ids import *
+from .loader import *
+from .metrics import *
 from .orm import *
+from .pagination import *
+from .partitioning import *
+from .profiler import *
 from .repo import *
\ No newline at end of file
@@ -0,0 +1,88 @@
+__all__ = (
+    'Deadline',
+    'DeadlineSession',
+    'current_deadline',
+    'deadline_scope',
+    'deadline',
+)
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_deadline: ContextVar[Optional['Deadline']] = ContextVar('deadline', default=None)
+
+
+class Deadline:
+    """
+    Point in time (monotonic clock) by which the current request must finish.
+    """
+
+    def __init__(self, seconds: float):
+        self.at = time.monotonic() + seconds
+
+    def reset(self, seconds: float):
+        self.at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.at - time.monotonic()
+
+
+def current_deadline() -> Optional[Deadline]:
+    return _deadline.get()
+
+
+@contextmanager
+def deadline_scope(seconds: float):
+    """
+    Sets a deadline `seconds` from now for the block, unless an earlier one is already set.
+    """
+    current = _deadline.get()
+    if current is not None and current.remaining() <= seconds:
+        yield current
+        return
+
+    scope = Deadline(seconds)
+    token = _deadline.set(scope)
+    try:
+        yield scope
+    finally:
+        _deadline.reset(token)
+
+
+def deadline(seconds: float):
+    """
+    Route dependency replacing the request's deadline, e.g. a longer one for a report:
+    `@router.get('/report', dependencies=[Depends(deadline(60))])`.
+    """
+
+    async def set_deadline():
+        if (current := _deadline.get()) is not None:
+            # The middleware watches the same object, so it sees the new deadline as well
+            current.reset(seconds)
+        else:
+            _deadline.set(Deadline(seconds))
+
+    return set_deadline
+
+
+class DeadlineSession(Session):
+    """
+    Session that applies the current deadline to every transaction it begins on PostgreSQL
+    as `SET LOCAL statement_timeout`, so the server cancels queries outliving the request.
+    """
+
+
+@event.listens_for(DeadlineSession, 'after_begin')
+def _apply_statement_timeout(session, transaction, connection):
+    current = _deadline.get()
+    if current is None or connection.dialect.name != 'postgresql':
+        return
+
+    # An already expired deadline still gets the smallest timeout, as 0 would disable it
+    timeout_ms = max(int(current.remaining() * 1000), 1)
+    connection.exec_driver_sql(f'SET LOCAL statement_timeout = {timeout_ms}')
@@ -2,24 +2,105 @@ __all__ = (
     'DatabaseHelper',
     'db_helper',
     'get_db',
+    'get_uow',
 )
 
+import time
 from asyncio import current_task
 from contextlib import asynccontextmanager
-from typing import AsyncIterator
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional, Sequence, Literal
 
+from sqlalchemy import MetaData, event, make_url
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker, async_scoped_session
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 
 from config.settings import DB_SETTINGS
+from .deadline import DeadlineSession
+from .metrics import InstrumentedQueuePool
+from .profiler import QueryProfiler, query_profiler
+
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar('current_session', default=None)
+_last_write_at: ContextVar[Optional[float]] = ContextVar('last_write_at', default=None)
+
+QUEUE_POOL_OPTIONS = ('poolclass', 'pool_size', 'max_overflow', 'pool_timeout')
+
+
+# Writes through any session, such as `get_db` ones used without the repositories, keep the context's reads on the primary
+@event.listens_for(Session, 'after_flush')
+def _mark_flushed(session, flush_context):
+    _last_write_at.set(time.monotonic())
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _mark_executed(orm_execute_state):
+    if not orm_execute_state.is_select:
+        _last_write_at.set(time.monotonic())
 
 
 class DatabaseHelper:
-    def __init__(self, url, echo: bool):
-        self.engine = create_async_engine(url, echo=echo)
-        self.session_factory = async_sessionmaker(
-            self.engine,
+    def __init__(
+            self,
+            url,
+            echo: bool,
+            replica_urls: Sequence[str] = (),
+            balancing: Literal['round_robin', 'least_connections'] = 'round_robin',
+            read_your_writes: float = 0,
+            profiler: Optional[QueryProfiler] = None,
+            **engine_options,
+    ):
+        """
+        :param url: Primary database URL
+        :param echo: Whether to log statements
+        :param replica_urls: Read replica URLs
+        :param balancing: How reads are spread over replicas
+        :param read_your_writes: Seconds a context keeps reading from the primary after a write
+        :param profiler: Query profiler to attach to every engine
+        :param engine_options: Extra `create_async_engine` options (pool sizing etc.), applied to every engine
+        """
+        engine_options.setdefault('poolclass', InstrumentedQueuePool)
+        self.engine_options = engine_options
+        self.profiler = profiler
+
+        self.engine = self._create_engine(url, echo)
+        self.session_factory = self._make_session_factory(self.engine)
+
+        self.replica_engines = [self._create_engine(replica_url, echo) for replica_url in replica_urls]
+        self.replica_session_factories = [self._make_session_factory(engine) for engine in self.replica_engines]
+        self.balancing = balancing
+        self.read_your_writes = read_your_writes
+        self._replica_in_use = [0] * len(self.replica_engines)
+        self._replica_counter = 0
+
+    def _create_engine(self, url, echo: bool):
+        url = make_url(url)
+        options = self.engine_options
+        if url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:'):
+            # An in-memory database lives and dies with its connection, so every session must share one
+            options = {key: value for key, value in options.items() if key not in QUEUE_POOL_OPTIONS}
+            options['poolclass'] = StaticPool
+
+        engine = create_async_engine(url, echo=echo, **options)
+        if url.get_backend_name() == 'sqlite':
+            event.listen(engine.sync_engine, 'connect', self._enable_sqlite_foreign_keys)
+        if self.profiler is not None:
+            self.profiler.attach(engine)
+        return engine
+
+    @staticmethod
+    def _enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+    @staticmethod
+    def _make_session_factory(engine):
+        return async_sessionmaker(
+            engine,
             expire_on_commit=False,
             class_=AsyncSession,
+            sync_session_class=DeadlineSession,
             autoflush=False,
             autocommit=False,
         )
@@ -45,10 +126,139 @@ class DatabaseHelper:
         finally:
             await session.close()
 
+    async def create_schema(self, metadata: MetaData):
+        """
+        Creates every table of `metadata` on the primary database, e.g. to set up a
+        SQLite database for tests or benchmarks without running migrations.
+        """
+        async with self.engine.begin() as connection:
+            await connection.run_sync(metadata.create_all)
+
+    async def drop_schema(self, metadata: MetaData):
+        """
+        Drops every table of `metadata` on the primary database.
+        """
+        async with self.engine.begin() as connection:
+            await connection.run_sync(metadata.drop_all)
+
+    def pool_metrics(self) -> dict:
+        """
+        Pool gauges and checkout metrics of the primary and replica engines.
+        """
+
+        def snapshot(engine):
+            pool = engine.pool
+            metrics = getattr(pool, 'metrics', None)
+            return metrics.snapshot(pool) if metrics is not None else {'status': pool.status()}
+
+        return {
+            'primary': snapshot(self.engine),
+            'replicas': [snapshot(engine) for engine in self.replica_engines],
+        }
 
-db_helper = DatabaseHelper(DB_SETTINGS.URL, DB_SETTINGS.ECHO)
+    def mark_write(self):
+        """
+        Records a write in the current context, so its reads stay on the primary
+        for `read_your_writes` seconds. Flushes and DML statements of any session
+        are recorded automatically; this is for writes made around the ORM.
+        """
+        if self.read_your_writes:
+            _last_write_at.set(time.monotonic())
+
+    def _choose_replica(self) -> Optional[int]:
+        if not self.replica_engines:
+            return None
+
+        last_write_at = _last_write_at.get()
+        if last_write_at is not None and time.monotonic() - last_write_at < self.read_your_writes:
+            return None
+
+        if self.balancing == 'least_connections':
+            return min(range(len(self._replica_in_use)), key=self._replica_in_use.__getitem__)
+
+        self._replica_counter = (self._replica_counter + 1) % len(self.replica_engines)
+        return self._replica_counter
+
+    @asynccontextmanager
+    async def read_session(self) -> AsyncIterator[AsyncSession]:
+        """
+        Yields a session for read-only work. Reads go to a replica, picked round-robin
+        or by the fewest sessions in use, unless a unit of work is active, no replicas
+        are configured, or the context wrote within the last `read_your_writes` seconds;
+        in those cases the primary (or the unit-of-work session) is used.
+        """
+        if (session := _current_session.get()) is not None:
+            yield session
+            return
+
+        index = self._choose_replica()
+        if index is None:
+            async with self.session() as session:
+                yield session
+            return
+
+        self._replica_in_use[index] += 1
+        session = self.replica_session_factories[index]()
+        try:
+            yield session
+        finally:
+            self._replica_in_use[index] -= 1
+            await session.close()
+
+    @property
+    def current_session(self) -> Optional[AsyncSession]:
+        """
+        The session bound by the innermost active unit of work, if any.
+        """
+        return _current_session.get()
+
+    @asynccontextmanager
+    async def unit_of_work(self) -> AsyncIterator[AsyncSession]:
+        """
+        Binds one session to the current context, so every repository call made
+        inside the block reuses it (and its connection) instead of opening its own.
+        Repository writes only flush; the transaction is committed once on exit
+        and rolled back if the block raises. Nested blocks join the outer one.
+        Like any AsyncSession, the bound session must not be used by concurrent tasks.
+        Coroutine functions registered in `session.info['after_commit']` (a dict, so
+        repeated registrations under one key run once) are awaited after the commit.
+        """
+        if (session := _current_session.get()) is not None:
+            yield session
+            return
+
+        async with self.session() as session:
+            token = _current_session.set(session)
+            try:
+                yield session
+                await session.commit()
+            finally:
+                _current_session.reset(token)
+
+            for callback in session.info.pop('after_commit', {}).values():
+                await callback()
+
+
+db_helper = DatabaseHelper(
+    DB_SETTINGS.URL,
+    DB_SETTINGS.ECHO,
+    replica_urls=DB_SETTINGS.DB_REPLICA_URLS,
+    balancing=DB_SETTINGS.DB_REPLICA_BALANCING,
+    read_your_writes=DB_SETTINGS.DB_READ_YOUR_WRITES_SECONDS,
+    profiler=query_profiler,
+    pool_size=DB_SETTINGS.DB_POOL_SIZE,
+    max_overflow=DB_SETTINGS.DB_MAX_OVERFLOW,
+    pool_timeout=DB_SETTINGS.DB_POOL_TIMEOUT,
+    pool_recycle=DB_SETTINGS.DB_POOL_RECYCLE,
+    pool_pre_ping=DB_SETTINGS.DB_POOL_PRE_PING,
+)
 
 
 async def get_db() -> AsyncIterator[AsyncSession]:
     async with db_helper.session() as session:
         yield session
+
+
+async def get_uow() -> AsyncIterator[AsyncSession]:
+    async with db_helper.unit_of_work() as session:
+        yield session
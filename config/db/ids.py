@@ -0,0 +1,185 @@
+__all__ = (
+    'SnowflakeGenerator',
+    'SnowflakeId',
+    'snowflake',
+)
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Annotated, Optional
+
+from pydantic import PlainSerializer
+
+from config.settings import DB_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Snowflake ids exceed 2^53, past which JavaScript numbers lose precision, so schemas send them as strings
+SnowflakeId = Annotated[int, PlainSerializer(str, return_type=str, when_used='json')]
+
+# Extend or free the lease only while this process still holds it
+_RENEW_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('expire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_LEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class SnowflakeGenerator:
+    """
+    Time-ordered 64-bit ids made of 41 bits of milliseconds since `epoch`, a 10-bit worker id
+    and a 12-bit sequence, so up to 4096 ids per millisecond per worker, for about 69 years.
+    Ids are increasing per worker and roughly ordered across workers, which keeps B-tree
+    inserts at the right edge of the index like a sequence does.
+
+    Two processes with the same worker id generate the same ids, so each process leases its
+    own from Redis (`await snowflake.lease(redis_client)`), which the app does on startup when
+    a model uses `snowflake` as its `__id_generator__`. A configured worker id
+    is leased as well, so a second process started with it (e.g. another gunicorn worker)
+    fails instead of sharing it. Rather than guessing an id, `next_id` raises RuntimeError
+    when there is none, its lease could not be renewed, or the process was forked after
+    taking it.
+
+    The ids exceed 2^53, so schemas should declare them as `SnowflakeId`, which JSON
+    serializes as a string for JavaScript clients.
+    """
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+    MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+    EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    LEASE_KEY = 'snowflake:worker:{}'
+
+    def __init__(self, worker_id: Optional[int] = None, epoch: datetime = EPOCH):
+        """
+        :param worker_id: Id (0-1023) reserved for this process; None to lease any free one
+        :param epoch: Start of the timestamp range
+        """
+        if worker_id is not None and not 0 <= worker_id <= self.MAX_WORKER_ID:
+            raise ValueError(f"'worker_id' must be between 0 and {self.MAX_WORKER_ID}")
+
+        self._configured_id = self._worker_id = worker_id
+        self._token = None
+        self._owner_pid = None
+        self._lease_expires_at = None
+        self._lease_task: Optional[asyncio.Task] = None
+        self.epoch_ms = int(epoch.timestamp() * 1000)
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    @property
+    def worker_id(self) -> int:
+        if self._worker_id is None:
+            raise RuntimeError(
+                "No Snowflake worker id: set DB_WORKER_ID (unique per process) or lease one with `snowflake.lease`"
+            )
+        if self._owner_pid is None:
+            self._owner_pid = os.getpid()
+        elif self._owner_pid != os.getpid():
+            raise RuntimeError(
+                "The Snowflake worker id was taken before this process was forked and is shared with its parent; "
+                "lease worker ids in each worker instead"
+            )
+        if self._lease_expires_at is not None and time.monotonic() >= self._lease_expires_at:
+            raise RuntimeError(f"The lease of Snowflake worker id {self._worker_id} could not be renewed")
+        return self._worker_id
+
+    async def lease(self, client, ttl: int = 60) -> int:
+        """
+        Takes the configured worker id, or else a free one, in Redis for this process and keeps
+        renewing it every `ttl / 3` seconds.
+
+        :param client: Redis client
+        :param ttl: Seconds the lease outlives a process that stopped renewing it
+        :return: The leased worker id
+        """
+        token = f'{socket.gethostname()}:{os.getpid()}'
+        if self._configured_id is not None:
+            candidates = [self._configured_id]
+        else:
+            # Probing from a per-process offset keeps workers starting together from contending for the same ids
+            first = zlib.crc32(token.encode()) & self.MAX_WORKER_ID
+            candidates = [(first + offset) & self.MAX_WORKER_ID for offset in range(self.MAX_WORKER_ID + 1)]
+
+        for worker_id in candidates:
+            if await client.set(self.LEASE_KEY.format(worker_id), token, nx=True, ex=ttl):
+                break
+        else:
+            if self._configured_id is not None:
+                raise RuntimeError(
+                    f"Snowflake worker id {self._configured_id} (DB_WORKER_ID) is leased by another process; "
+                    f"give each process its own id or unset DB_WORKER_ID to lease a free one"
+                )
+            raise RuntimeError(f"All {self.MAX_WORKER_ID + 1} Snowflake worker ids are leased")
+
+        self._worker_id = worker_id
+        self._token = token
+        self._owner_pid = os.getpid()
+        self._lease_expires_at = time.monotonic() + ttl
+        self._lease_task = asyncio.create_task(self._renew_lease(client, worker_id, token, ttl))
+        logger.info(f"Leased Snowflake worker id {worker_id}")
+        return worker_id
+
+    async def _renew_lease(self, client, worker_id: int, token: str, ttl: int):
+        key = self.LEASE_KEY.format(worker_id)
+        while True:
+            await asyncio.sleep(ttl / 3)
+            try:
+                renewed_at = time.monotonic()
+                if not await client.eval(_RENEW_LEASE, 1, key, token, ttl):
+                    # Another process holds the id now: stop generating instead of duplicating its ids
+                    logger.error(f"Lost the lease of Snowflake worker id {worker_id}")
+                    self._lease_expires_at = renewed_at
+                    return
+                self._lease_expires_at = renewed_at + ttl
+            except Exception as e:
+                # Ids stay valid until the current lease runs out
+                logger.error(f"Error renewing the lease of Snowflake worker id {worker_id}: {e}")
+
+    async def release(self, client):
+        """
+        Stops renewing the leased worker id and frees it.
+        """
+        if self._lease_task is None:
+            return
+        self._lease_task.cancel()
+        self._lease_task = None
+        await client.eval(_RELEASE_LEASE, 1, self.LEASE_KEY.format(self._worker_id), self._token)
+        self._worker_id = self._configured_id
+        self._token = self._lease_expires_at = None
+
+    def next_id(self) -> int:
+        with self._lock:
+            now = time.time_ns() // 1_000_000 - self.epoch_ms
+            if now <= self._last_ms:
+                # Same millisecond, or the clock moved back: continue from the last timestamp
+                now = self._last_ms
+                self._sequence = (self._sequence + 1) & self.MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Sequence exhausted: borrow the next millisecond instead of waiting for it
+                    now += 1
+            else:
+                self._sequence = 0
+
+            self._last_ms = now
+            return (now << (self.WORKER_BITS + self.SEQUENCE_BITS)) | (self.worker_id << self.SEQUENCE_BITS) | self._sequence
+
+    def __call__(self) -> int:
+        return self.next_id()
+
+
+snowflake = SnowflakeGenerator(DB_SETTINGS.DB_WORKER_ID)
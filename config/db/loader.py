@@ -0,0 +1,127 @@
+__all__ = (
+    'PrimaryKeyLoader',
+    'batch_loading',
+    'get_loader',
+    'clear_loaders',
+)
+
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional, Hashable
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Loaders of the current request, keyed by (model, load spec)
+_loaders: ContextVar[Optional[dict]] = ContextVar('batch_loaders', default=None)
+
+
+@contextmanager
+def batch_loading():
+    """
+    Opens a batching scope (one per request): primary-key lookups made inside it
+    share loaders, so they are batched and each key is fetched once.
+    """
+    token = _loaders.set({})
+    try:
+        yield
+    finally:
+        _loaders.reset(token)
+
+
+def get_loader(repo, spec: tuple) -> Optional['PrimaryKeyLoader']:
+    """
+    :param repo: Repository of the model to load
+    :param spec: Normalized load spec, see `SqlAlchemyRepository.load_spec`
+    :return: The scope's loader for the model and spec, or None outside a batching scope
+    """
+    loaders = _loaders.get()
+    if loaders is None:
+        return None
+
+    loader = loaders.get((repo.model, spec))
+    if loader is None:
+        loader = loaders[(repo.model, spec)] = PrimaryKeyLoader(repo, spec)
+    return loader
+
+
+def clear_loaders(model):
+    """
+    Forgets the rows of `model` loaded in the current scope, e.g. after a write.
+    """
+    for (loader_model, _), loader in (_loaders.get() or {}).items():
+        if loader_model is model:
+            loader.clear()
+
+
+# Writes through any session, such as `get_db` ones used without the repositories, also clear the loaders
+@event.listens_for(Session, 'after_flush')
+def _clear_flushed(session, flush_context):
+    if _loaders.get():
+        for model in {type(instance) for instance in (*session.new, *session.dirty, *session.deleted)}:
+            clear_loaders(model)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _clear_executed(orm_execute_state):
+    if _loaders.get() and not orm_execute_state.is_select and orm_execute_state.bind_mapper is not None:
+        clear_loaders(orm_execute_state.bind_mapper.class_)
+
+
+class PrimaryKeyLoader:
+    """
+    DataLoader-style batching of primary-key lookups: keys requested within one
+    event-loop tick are fetched together with a single `id IN (...)` query, and
+    every key is fetched at most once while the loader lives.
+    """
+
+    def __init__(self, repo, spec: tuple = ()):
+        self.repo = repo
+        self.spec = spec
+        self._futures: dict[Hashable, asyncio.Future] = {}
+        self._pending: dict[Hashable, asyncio.Future] = {}
+        self._tasks = set()
+
+    async def load(self, pk: Hashable):
+        """
+        :return: The instance with the primary key, or None if there is none
+        """
+        future = self._futures.get(pk)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._futures[pk] = self._pending[pk] = loop.create_future()
+            if len(self._pending) == 1:
+                task = asyncio.ensure_future(self._dispatch())
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        # A cancelled caller must not cancel the lookup shared with the others
+        return await asyncio.shield(future)
+
+    def clear(self):
+        self._futures.clear()
+
+    async def _dispatch(self):
+        # The task starts after the tasks already ready to run, and yields once more
+        # so that tasks they spawn (e.g. a nested `gather`) can add their keys too
+        await asyncio.sleep(0)
+        futures, self._pending = self._pending, {}
+        try:
+            instances = await self.repo._with_read_session(self.repo.db_load_many, list(futures), load=self.spec)
+        except BaseException as e:
+            for pk, future in futures.items():
+                if self._futures.get(pk) is future:
+                    del self._futures[pk]
+                if not future.done():
+                    if isinstance(e, asyncio.CancelledError):
+                        future.cancel()
+                    else:
+                        future.set_exception(e)
+            if not isinstance(e, Exception):
+                raise
+            return
+
+        found = {instance.id: instance for instance in instances}
+        for pk, future in futures.items():
+            if not future.done():
+                future.set_result(found.get(pk))
@@ -0,0 +1,167 @@
+__all__ = (
+    'archive_soft_deleted',
+    'archive_all_soft_deleted',
+    'maintain_partitions',
+    'run_maintenance',
+)
+
+import asyncio
+import logging
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, text
+
+from config.settings import DB_SETTINGS
+from models import Base
+from utils import utcnow
+from .engine import db_helper
+from .partitioning import partitioned_tables
+
+logger = logging.getLogger(__name__)
+
+# Advisory lock key serializing partition maintenance across workers starting at once
+PARTITION_LOCK_KEY = 0x70617274
+
+
+async def archive_soft_deleted(
+        model,
+        older_than: timedelta = timedelta(days=DB_SETTINGS.DB_ARCHIVE_AFTER_DAYS),
+        batch_size: int = DB_SETTINGS.DB_ARCHIVE_BATCH_SIZE,
+        helper=db_helper,
+) -> int:
+    """
+    Moves rows of a `SoftDeleteMixin` model deleted more than `older_than` ago into its
+    archive table, `batch_size` rows per transaction so locks and replication lag stay small.
+
+    :param model: Soft-delete model
+    :param older_than: Minimum time since deletion
+    :param batch_size: Number of rows moved per transaction
+    :param helper: Database helper to run on
+    :return: Number of rows moved
+    """
+    table, archive = model.__table__, model.__archive_table__
+    batch = (
+        select(table.c.id)
+        .where(table.c.deleted.is_(True), table.c.deleted_at < utcnow() - older_than)
+        .order_by(table.c.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+
+    moved = 0
+    while True:
+        async with helper.session() as session:
+            ids = (await session.scalars(batch)).all()
+            if ids:
+                await session.execute(
+                    insert(archive).from_select(
+                        [archive.c[column.name] for column in table.columns],
+                        select(*table.columns).where(table.c.id.in_(ids)),
+                    )
+                )
+                await session.execute(delete(table).where(table.c.id.in_(ids)))
+                await session.commit()
+
+        moved += len(ids)
+        if len(ids) < batch_size:
+            return moved
+
+
+async def archive_all_soft_deleted(**kwargs) -> dict[str, int]:
+    """
+    Runs `archive_soft_deleted` for every soft-delete model.
+
+    :return: Number of rows moved per table
+    """
+    result = {}
+    for mapper in Base.registry.mappers:
+        model = mapper.class_
+        if '__archive_table__' in model.__dict__:
+            result[model.__tablename__] = await archive_soft_deleted(model, **kwargs)
+            logger.info(f"Archived {result[model.__tablename__]} deleted rows of {model.__tablename__}")
+    return result
+
+
+async def maintain_partitions(now: datetime = None, helper=db_helper) -> dict[str, dict[str, list[str]]]:
+    """
+    Creates the partitions of the current and the next `premake` months of every
+    `RangeByMonth` table, and detaches (then drops, unless `drop=False`) partitions
+    older than the retention, so expiring a month of rows is a metadata operation.
+    PostgreSQL only. A partitioned table has no partitions after its migration, and
+    inserts fail until this runs, so the app runs it on startup (see
+    `DB_MAINTAIN_PARTITIONS_ON_STARTUP`); schedule it (e.g. daily, through
+    `python -m config.db.maintenance`) so upcoming months exist before they start.
+
+    :param now: Reference time, defaults to the current time
+    :param helper: Database helper to run on
+    :return: Names of the created and removed partitions per table
+    """
+    now = now or utcnow()
+    result = {}
+    if not partitioned_tables(Base.metadata):
+        return result
+
+    async with helper.session() as session:
+        connection = await session.connection()
+        if connection.dialect.name != 'postgresql':
+            logger.warning(f"Partitioning is not supported on {connection.dialect.name}")
+            return result
+
+        preparer = connection.dialect.identifier_preparer
+        for name, (table, partition) in partitioned_tables(Base.metadata).items():
+            parent = preparer.format_table(table)
+            schema = f'{preparer.quote_schema(table.schema)}.' if table.schema else ''
+            # Held until the table's transaction commits, so concurrent runs see each other's partitions
+            await session.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': PARTITION_LOCK_KEY})
+            existing = (await session.scalars(
+                text(
+                    'SELECT child.relname FROM pg_inherits '
+                    'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                    'WHERE pg_inherits.inhparent = CAST(:parent AS regclass)'
+                ),
+                {'parent': parent},
+            )).all()
+
+            # Each table is committed on its own, so the connection is taken per transaction
+            connection = await session.connection()
+            created, removed = [], []
+            for start in partition.upcoming(now):
+                partition_name = partition.partition_name(table.name, start)
+                if partition_name in existing:
+                    continue
+                end = partition.add_months(start, 1)
+                await connection.exec_driver_sql(
+                    f'CREATE TABLE IF NOT EXISTS {schema}{preparer.quote(partition_name)} PARTITION OF {parent} '
+                    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+                )
+                created.append(partition_name)
+
+            for partition_name in existing:
+                start = partition.partition_start(table.name, partition_name)
+                if start is None or not partition.expired(start, now):
+                    continue
+                qualified = f'{schema}{preparer.quote(partition_name)}'
+                await connection.exec_driver_sql(f'ALTER TABLE {parent} DETACH PARTITION {qualified}')
+                if partition.drop:
+                    await connection.exec_driver_sql(f'DROP TABLE {qualified}')
+                removed.append(partition_name)
+
+            await session.commit()
+            result[name] = {'created': created, 'removed': removed}
+            logger.info(f"Partitions of {name}: created {created}, removed {removed}")
+    return result
+
+
+async def run_maintenance(helper=db_helper):
+    """
+    Runs every maintenance job; the engine is disposed at the end, as its connections belong to this event loop.
+    """
+    try:
+        await maintain_partitions(helper=helper)
+        await archive_all_soft_deleted(helper=helper)
+    finally:
+        await helper.engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(run_maintenance())
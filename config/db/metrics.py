@@ -0,0 +1,75 @@
+__all__ = (
+    'PoolMetrics',
+    'InstrumentedQueuePool',
+)
+
+import bisect
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """
+    Checkout latency histogram and counters of a connection pool.
+    """
+    BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+    def __init__(self):
+        self.bucket_counts = [0] * (len(self.BUCKETS) + 1)
+        self.checkouts = 0
+        self.checkout_seconds = 0.0
+        self.timeouts = 0
+
+    def observe_checkout(self, seconds: float):
+        self.bucket_counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.checkouts += 1
+        self.checkout_seconds += seconds
+
+    def snapshot(self, pool) -> dict:
+        """
+        :param pool: The pool these metrics belong to, for its current gauges
+        :return: Gauges, counters and the cumulative checkout latency histogram
+        """
+        buckets, cumulative = {}, 0
+        for bound, count in zip((*self.BUCKETS, '+Inf'), self.bucket_counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+
+        return {
+            'size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'timeouts': self.timeouts,
+            'checkouts': self.checkouts,
+            'checkout_seconds_sum': self.checkout_seconds,
+            'checkout_seconds_buckets': buckets,
+        }
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    `AsyncAdaptedQueuePool` that times every checkout, including waits for a free
+    connection and connection creation, and counts checkout timeouts.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.metrics.timeouts += 1
+            raise
+        finally:
+            self.metrics.observe_checkout(time.perf_counter() - start)
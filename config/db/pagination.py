@@ -0,0 +1,145 @@
+__all__ = (
+    'encode_cursor',
+    'decode_cursor',
+    'HasNextParams',
+    'HasNextPage',
+    'KeysetPage',
+)
+
+import base64
+import hashlib
+import hmac
+import json
+from datetime import datetime, date, time
+from decimal import Decimal
+from typing import Any, Sequence, Generic, TypeVar
+
+from fastapi_pagination import Params
+from fastapi_pagination.bases import AbstractPage, AbstractParams
+from fastapi_pagination.cursor import CursorPage
+from fastapi_pagination.customization import CustomizedPage, UseIncludeTotal
+from fastapi_pagination.types import GreaterEqualOne
+
+from config.settings import JWT_SETTINGS
+from utils.exceptions import BadRequest
+
+T = TypeVar('T')
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + '=' * (-len(data) % 4))
+
+
+def _sign(data: bytes, secret_key: str) -> bytes:
+    # A key derived for cursors only, so a cursor signature is never a valid signature made with the JWT secret itself
+    cursor_key = hmac.new(secret_key.encode(), b'cursor', hashlib.sha256).digest()
+    return hmac.new(cursor_key, data, hashlib.sha256).digest()
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(value: Any, column) -> Any:
+    if value is None:
+        return None
+    try:
+        python_type = column.type.python_type
+    except NotImplementedError:
+        return value
+    if python_type in (datetime, date, time):
+        return python_type.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    return value
+
+
+def encode_cursor(
+        columns: Sequence,
+        values: Sequence[Any],
+        descending: bool,
+        secret_key: str = JWT_SETTINGS.JWT_SECRET_KEY,
+) -> str:
+    """
+    Builds an opaque, signed keyset cursor pointing after the given row values.
+
+    :param columns: Ordering columns
+    :param values: Values of the ordering columns of the last row on the page
+    :param descending: Whether the ordering is descending
+    :param secret_key: Secret the cursor signing key is derived from
+    :return: URL-safe cursor string
+    """
+    payload = json.dumps(
+        {
+            'k': [column.key for column in columns],
+            'v': [_dump_value(value) for value in values],
+            'd': descending,
+        },
+        separators=(',', ':'),
+    ).encode()
+    return f'{_b64encode(payload)}.{_b64encode(_sign(payload, secret_key))}'
+
+
+def decode_cursor(
+        cursor: str,
+        columns: Sequence,
+        descending: bool,
+        secret_key: str = JWT_SETTINGS.JWT_SECRET_KEY,
+) -> list[Any]:
+    """
+    Verifies a cursor produced by `encode_cursor` and returns the row values it points after.
+
+    :param cursor: Cursor string
+    :param columns: Ordering columns the cursor must have been built for
+    :param descending: Ordering direction the cursor must have been built for
+    :param secret_key: Secret the cursor signing key is derived from
+    :return: Values of the ordering columns
+    """
+    try:
+        payload, signature = cursor.split('.', 1)
+        payload = _b64decode(payload)
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload, secret_key)):
+            raise ValueError('signature mismatch')
+        data = json.loads(payload)
+        if data['k'] != [column.key for column in columns] or data['d'] != descending:
+            raise ValueError('ordering mismatch')
+        return [_load_value(value, column) for value, column in zip(data['v'], columns, strict=True)]
+    except (ValueError, KeyError, TypeError):
+        raise BadRequest('Invalid cursor value')
+
+
+class HasNextParams(Params):
+    """
+    Page/size params for pages that report `has_next` instead of counting the total.
+    """
+
+
+class HasNextPage(AbstractPage[T], Generic[T]):
+    items: Sequence[T]
+    page: GreaterEqualOne
+    size: GreaterEqualOne
+    has_next: bool
+
+    __params_type__ = HasNextParams
+
+    @classmethod
+    def create(cls, items: Sequence[T], params: AbstractParams, *, has_next: bool = False, **kwargs):
+        if not isinstance(params, HasNextParams):
+            raise TypeError("HasNextPage should be used with HasNextParams")
+
+        kwargs.pop('total', None)
+        return cls(items=items, page=params.page, size=params.size, has_next=has_next, **kwargs)
+
+
+HasNextParams.set_page(HasNextPage)
+
+# Cursor page without `total`, so `cursor_page` runs no count at all
+KeysetPage = CustomizedPage[CursorPage[T], UseIncludeTotal(False)]
@@ -0,0 +1,153 @@
+__all__ = (
+    'RangeByMonth',
+    'partitioned_tables',
+    'is_partition_table',
+)
+
+import re
+from datetime import datetime, timezone
+from typing import Optional
+
+import sqlalchemy as sa
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import mapped_column
+from sqlalchemy.schema import CreateColumn
+
+# Partitioning of each partitioned table. It is kept out of `Table.info`, which Alembic
+# autogenerate renders literally into migrations.
+_partitions: dict[sa.Table, 'RangeByMonth'] = {}
+
+
+class RangeByMonth:
+    """
+    Declarative monthly range partitioning of a model table on a timestamp column::
+
+        class Event(BaseModel):
+            __partition__ = RangeByMonth('created_at', premake=3, retention=12)
+
+    The table is created `PARTITION BY RANGE (created_at)`, its primary key becomes
+    `(id, created_at)` as PostgreSQL requires the partition key in every unique
+    constraint, and `id` becomes a BIGSERIAL unless the model has an `__id_generator__`. Partitions are named
+    `{table}_pYYYYMM` and managed by `config.db.maintenance.maintain_partitions`.
+
+    SQLite (e.g. in tests) has no partitioning and cannot autoincrement a composite primary
+    key, so there the table is created plain, with `id INTEGER PRIMARY KEY` alone.
+    """
+
+    def __init__(self, column: str = 'created_at', premake: int = 3, retention: Optional[int] = None, drop=True):
+        """
+        :param column: Timestamp column to partition on
+        :param premake: Number of upcoming months to create partitions for in advance
+        :param retention: Number of months of partitions to keep, including the current one; None keeps all
+        :param drop: Whether expired partitions are dropped, or only detached
+        """
+        self.column = column
+        self.premake = premake
+        self.retention = retention
+        self.drop = drop
+
+    @property
+    def partition_by(self) -> str:
+        return f'RANGE ({self.column})'
+
+    def prepare(self, cls):
+        """
+        Adjusts a model class before it is mapped.
+        """
+        table_args = cls.__dict__.get('__table_args__', ())
+        if isinstance(table_args, dict):
+            args, kwargs = (), table_args
+        elif table_args and isinstance(table_args[-1], dict):
+            args, kwargs = table_args[:-1], table_args[-1]
+        else:
+            args, kwargs = tuple(table_args), {}
+
+        cls.__table_args__ = (
+            *args,
+            sa.PrimaryKeyConstraint('id', self.column),
+            {**kwargs, 'postgresql_partition_by': self.partition_by},
+        )
+        if (generator := getattr(cls, '__id_generator__', None)) is not None:
+            cls.id = mapped_column(sa.BigInteger(), autoincrement=False, index=True, default=generator.next_id)
+        else:
+            # Identity columns are not supported on partitioned tables before PostgreSQL 17; this renders BIGSERIAL
+            cls.id = mapped_column(sa.BigInteger(), autoincrement=True, index=True)
+
+    def register(self, table: sa.Table):
+        """
+        Records the table as partitioned by this spec, once the model is mapped.
+        """
+        _partitions[table] = self
+
+    @staticmethod
+    def month_start(value: datetime) -> datetime:
+        return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+    @staticmethod
+    def add_months(start: datetime, months: int) -> datetime:
+        month = start.month - 1 + months
+        return start.replace(year=start.year + month // 12, month=month % 12 + 1)
+
+    @staticmethod
+    def partition_name(table_name: str, start: datetime) -> str:
+        return f'{table_name}_p{start:%Y%m}'
+
+    @staticmethod
+    def partition_start(table_name: str, partition_name: str) -> Optional[datetime]:
+        """
+        :return: The first day of the partition's month, or None if the name is not a partition of the table
+        """
+        match = re.fullmatch(rf'{re.escape(table_name)}_p(\d{{4}})(\d{{2}})', partition_name)
+        if match is None:
+            return None
+        return datetime(int(match[1]), int(match[2]), 1, tzinfo=timezone.utc)
+
+    def upcoming(self, now: datetime) -> list[datetime]:
+        """
+        :return: First days of the months partitions must exist for: the current one and `premake` more
+        """
+        start = self.month_start(now)
+        return [self.add_months(start, offset) for offset in range(self.premake + 1)]
+
+    def expired(self, start: datetime, now: datetime) -> bool:
+        if self.retention is None:
+            return False
+        return start < self.add_months(self.month_start(now), 1 - self.retention)
+
+
+def partitioned_tables(metadata: sa.MetaData) -> dict[str, tuple[sa.Table, RangeByMonth]]:
+    """
+    :return: Partitioned tables of the metadata by name, with their partitioning
+    """
+    return {
+        table.name: (table, _partitions[table])
+        for table in metadata.tables.values() if table in _partitions
+    }
+
+
+def is_partition_table(name: str, metadata: sa.MetaData) -> bool:
+    """
+    Whether a database table is a partition of one of the metadata's partitioned tables;
+    used by Alembic's `include_object` so partitions are not autogenerated as drops.
+    """
+    return any(
+        partition.partition_start(table_name, name) is not None
+        for table_name, (_, partition) in partitioned_tables(metadata).items()
+    )
+
+
+@compiles(CreateColumn, 'sqlite')
+def _create_sqlite_column(create, compiler, **kwargs):
+    column = create.element
+    if column.table in _partitions and column.key == 'id':
+        # The rowid alias, which numbers rows like BIGSERIAL does
+        return f'{compiler.preparer.format_column(column)} INTEGER NOT NULL PRIMARY KEY'
+    return compiler.visit_create_column(create, **kwargs)
+
+
+@compiles(sa.PrimaryKeyConstraint, 'sqlite')
+def _create_sqlite_primary_key(constraint, compiler, **kwargs):
+    if constraint.table in _partitions:
+        # `id` is the primary key by itself, see `_create_sqlite_column`
+        return None
+    return compiler.visit_primary_key_constraint(constraint, **kwargs)
@@ -0,0 +1,159 @@
+__all__ = (
+    'QueryProfiler',
+    'query_profiler',
+    'repository_method',
+)
+
+import json
+import logging
+import random
+import re
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from config.settings import DB_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+# Name of the repository method ("Model.db_filter") running in the current context
+repository_method: ContextVar[Optional[str]] = ContextVar('repository_method', default=None)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PLACEHOLDER_LIST = re.compile(r'\(\s*(?:\$\d+|\?|%\(\w+\)s|%s)(?:\s*,\s*(?:\$\d+|\?|%\(\w+\)s|%s))*\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_sql(statement: str) -> str:
+    """
+    Reduces a statement to its shape: literals become `?`, placeholder lists
+    (expanded IN clauses) collapse to `(?)` and whitespace is squashed.
+    """
+    statement = _STRING_LITERAL.sub('?', statement)
+    statement = _PLACEHOLDER_LIST.sub('(?)', statement)
+    statement = _NUMBER_LITERAL.sub('?', statement)
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+class QueryProfiler:
+    """
+    Records per-statement latency on engines it is attached to, grouped by normalized SQL
+    and the repository method that issued it. Statements slower than `slow_ms` are logged
+    and kept; a `explain_sample_rate` share of slow SELECTs on PostgreSQL also gets an
+    `EXPLAIN (ANALYZE, BUFFERS)` plan, which runs the query a second time.
+    """
+
+    def __init__(self, slow_ms: float = 200, explain_sample_rate: float = 0.0, max_slow: int = 100):
+        self.slow_ms = slow_ms
+        self.explain_sample_rate = explain_sample_rate
+        self.statements: dict[str, dict] = {}
+        self.slow = deque(maxlen=max_slow)
+
+    def attach(self, engine):
+        sync_engine = getattr(engine, 'sync_engine', engine)
+        event.listen(sync_engine, 'before_cursor_execute', self._before_cursor_execute)
+        event.listen(sync_engine, 'after_cursor_execute', self._after_cursor_execute)
+        event.listen(sync_engine, 'handle_error', self._handle_error)
+
+    def _stats(self, sql: str) -> dict:
+        stats = self.statements.get(sql)
+        if stats is None:
+            stats = self.statements[sql] = {'count': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'methods': Counter()}
+        return stats
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # One start time per connection, which runs one statement at a time
+        conn.info['query_start_time'] = time.perf_counter()
+
+    def _handle_error(self, context):
+        # ExceptionContext has `connection` and `statement`, but no `conn`; both are None when connecting fails
+        if context.connection is None or context.statement is None:
+            return
+        if context.connection.info.pop('query_start_time', None) is not None:
+            self._stats(normalize_sql(context.statement))['errors'] += 1
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        duration_ms = (time.perf_counter() - conn.info.pop('query_start_time')) * 1000
+        sql = normalize_sql(statement)
+        # Async generators cannot hold a context variable across yields, so they tag statements instead
+        method = repository_method.get() or context.execution_options.get('repository_method')
+
+        stats = self._stats(sql)
+        stats['count'] += 1
+        stats['total_ms'] += duration_ms
+        stats['max_ms'] = max(stats['max_ms'], duration_ms)
+        if method:
+            stats['methods'][method] += 1
+
+        if duration_ms < self.slow_ms:
+            return
+
+        logger.warning(f"Slow query ({duration_ms:.1f} ms) in {method or 'unknown'}: {sql}")
+        entry = {'sql': sql, 'duration_ms': duration_ms, 'method': method, 'at': time.time(), 'plan': None}
+        if self._should_explain(conn, statement, context, executemany):
+            entry['plan'] = self._explain(conn, statement, parameters)
+        self.slow.append(entry)
+
+    def _should_explain(self, conn, statement, context, executemany) -> bool:
+        return (
+                self.explain_sample_rate > 0
+                and not executemany
+                and conn.dialect.name == 'postgresql'
+                and statement.lstrip().upper().startswith('SELECT')
+                and not context.execution_options.get('stream_results')
+                and random.random() < self.explain_sample_rate
+        )
+
+    @staticmethod
+    def _explain(conn, statement, parameters):
+        # A separate cursor, so the results of the profiled statement are left untouched
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f'EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {statement}', parameters)
+            plan = cursor.fetchone()[0]
+            return json.loads(plan) if isinstance(plan, str) else plan
+        except Exception as e:
+            logger.error(f"Error explaining slow query: {e}")
+            return None
+        finally:
+            cursor.close()
+
+    def report(self) -> dict:
+        """
+        :return: Statement stats sorted by total time, and the recent slow statements
+        """
+        statements = [
+            {
+                'sql': sql,
+                'count': stats['count'],
+                'errors': stats['errors'],
+                'total_ms': stats['total_ms'],
+                'mean_ms': stats['total_ms'] / stats['count'] if stats['count'] else 0.0,
+                'max_ms': stats['max_ms'],
+                'methods': dict(stats['methods']),
+            }
+            for sql, stats in self.statements.items()
+        ]
+        statements.sort(key=lambda item: item['total_ms'], reverse=True)
+        return {'statements': statements, 'slow': list(self.slow)}
+
+    def dump(self, path: str):
+        """
+        Writes the report to `path` as JSON.
+        """
+        with open(path, 'w') as file:
+            json.dump(self.report(), file, indent=2, default=str)
+
+    def reset(self):
+        self.statements.clear()
+        self.slow.clear()
+
+
+query_profiler = QueryProfiler(
+    slow_ms=DB_SETTINGS.DB_SLOW_QUERY_MS,
+    explain_sample_rate=DB_SETTINGS.DB_EXPLAIN_SAMPLE_RATE,
+) if DB_SETTINGS.DB_PROFILE else None
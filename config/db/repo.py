@@ -1,19 +1,102 @@
 __all__ = (
     'SqlAlchemyRepository',
+    'LOOKUP_OPERATORS',
+    'LOADER_STRATEGIES',
 )
 
-from sqlalchemy import func, exists, update, Select
+import asyncio
+import hashlib
+import json
+import logging
+import operator
+from contextlib import asynccontextmanager
+from typing import Optional, Sequence, Iterable, AsyncIterable, AsyncIterator, Literal, Union, Callable, Mapping
+
+from fastapi_pagination import create_page, Params
+from fastapi_pagination.cursor import CursorParams
+from sqlalchemy import func, exists, update, delete, Select, bindparam, tuple_, literal_column, inspect as sa_inspect, text, PrimaryKeyConstraint, UniqueConstraint
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.exc import NoResultFound
 from sqlalchemy.future import select
+from sqlalchemy.orm import selectinload, joinedload, subqueryload, make_transient_to_detached
 from sqlalchemy.sql.elements import and_
 
+from redis.exceptions import RedisError
+
+from config.redis import cache, CacheSerializer
+from config.settings import REDIS_SETTINGS
+from utils import utcnow
 from utils.exceptions import BadRequest
 from .engine import db_helper
+from .loader import get_loader, clear_loaders
+from .pagination import encode_cursor, decode_cursor, HasNextParams
+from .profiler import repository_method
+
+logger = logging.getLogger(__name__)
+
+# Cached query results hold column values of any type (datetimes, decimals, enums), which only pickle keeps as they are
+cache.register_namespace('repo', CacheSerializer(
+    'pickle',
+    compression=REDIS_SETTINGS.REDIS_COMPRESSION,
+    threshold=REDIS_SETTINGS.REDIS_COMPRESSION_THRESHOLD,
+))
+
+LOOKUP_OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'in': lambda field, value: field.in_(value),
+    'like': lambda field, value: field.like(value),
+    'ilike': lambda field, value: field.ilike(value),
+}
+
+# Comparisons with None in cached statements: a bound NULL never compares equal, so these render IS [NOT] NULL
+NULL_OPERATORS = {
+    'eq': lambda field: field.is_(None),
+    'ne': lambda field: field.is_not(None),
+}
+
+LOADER_STRATEGIES = {
+    'selectin': selectinload,
+    'joined': joinedload,
+    'subquery': subqueryload,
+}
+
+
+async def iter_chunks(rows: Union[Iterable[dict], AsyncIterable[dict]], size: int) -> AsyncIterator[list[dict]]:
+    """
+    Groups rows from a sync or async iterable into lists of at most `size` rows.
+    """
+    chunk = []
+    if isinstance(rows, AsyncIterable):
+        async for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    else:
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
 
 
 class SqlAlchemyRepository:
     db_helper = db_helper
     model = None
+    statement_cache_size: int = 512
+    keyset_order: Sequence[str] = None
+    default_load: Union[Sequence[str], Mapping[str, str]] = ()
+    cache_ttl: Optional[int] = None
+    soft_delete: bool = False
+    id_generator = None
 
     def __init_subclass__(cls, **kwargs):
         """
@@ -23,16 +106,174 @@ class SqlAlchemyRepository:
         if not cls.model:
             raise ValueError("'model' must be defined")
 
+        # Per-model caches, keyed by the shape (names) of the filter keys
+        cls._lookup_plans = {}
+        cls._statements = {}
+        cls._load_options = {}
+        cls._unique_keys = None
+        cls.default_load = getattr(cls.model, '__load__', cls.default_load)
+        cls.cache_ttl = getattr(cls.model, '__cache_ttl__', cls.cache_ttl)
+        cls.soft_delete = hasattr(cls.model, 'deleted')
+        cls.id_generator = getattr(cls.model, '__id_generator__', None)
+
+        if cls.keyset_order is None:
+            cls.keyset_order = ('created_at', 'id') if hasattr(cls.model, 'created_at') else ('id',)
+
     def select(self) -> Select[model]:
-        return select(self.model)
+        return select(self.model).where(*self.live_conditions())
+
+    def live_conditions(self) -> tuple:
+        """
+        Conditions excluding soft-deleted rows, for models with a `deleted` column.
+        They match the predicate of the partial indexes of `SoftDeleteMixin` models.
+        """
+        return (self.model.deleted.is_not(True),) if self.soft_delete else ()
+
+    @asynccontextmanager
+    async def _session_scope(self, readonly: bool = False):
+        """
+        Yields the session bound by `db_helper.unit_of_work()`, or a new one.
+        Read-only scopes may be served by a replica; other scopes count as writes.
+        """
+        if readonly:
+            async with self.db_helper.read_session() as session:
+                yield session
+            return
+
+        self.db_helper.mark_write()
+        if (session := self.db_helper.current_session) is not None:
+            yield session
+            return
+
+        async with self.db_helper.session() as session:
+            yield session
 
     async def _with_session(self, _func, *args, **kwargs):
         """
         Helper method to manage session creation and cleanup.
         Wraps any method that requires a database session.
+        Inside `db_helper.unit_of_work()` the bound session is reused.
         """
-        async with self.db_helper.session() as session:
-            return await _func(session, *args, **kwargs)
+        token = repository_method.set(f'{self.model.__name__}.{_func.__name__}')
+        try:
+            async with self._session_scope() as session:
+                result = await _func(session, *args, **kwargs)
+                clear_loaders(self.model)
+                await self._invalidate_after_commit(session)
+                return result
+        finally:
+            repository_method.reset(token)
+
+    async def _with_read_session(self, _func, *args, **kwargs):
+        """
+        Same as `_with_session`, for read-only methods that may run on a replica.
+        """
+        token = repository_method.set(f'{self.model.__name__}.{_func.__name__}')
+        try:
+            async with self._session_scope(readonly=True) as session:
+                return await _func(session, *args, **kwargs)
+        finally:
+            repository_method.reset(token)
+
+    async def _cached_read(self, _func, *args, **kwargs):
+        """
+        Runs a read method through the query-result cache when the model sets `__cache_ttl__`.
+        Results are kept in Redis under the model's cache version and the call arguments,
+        so bumping the version on writes drops every cached read of the model at once.
+        Reads with eager loads (related rows are not versioned with the model) and reads
+        inside a unit of work (which must see its own uncommitted writes) bypass the cache.
+        """
+        if (
+                not self.cache_ttl
+                or cache.client is None
+                or self.db_helper.current_session is not None
+                or ('load' in kwargs and self.load_spec(kwargs['load']))
+        ):
+            return await self._with_read_session(_func, *args, **kwargs)
+
+        version = await cache.get(self._cache_version_key()) or 0
+        arguments = json.dumps([args, kwargs], sort_keys=True, default=str)
+        key = (
+            f'repo:{self.model.__tablename__}:{version}:{_func.__name__}:'
+            f'{hashlib.sha1(arguments.encode()).hexdigest()}'
+        )
+        if (data := await cache.get(key)) is not None:
+            return self._load_result(data)
+
+        result = await self._with_read_session(_func, *args, **kwargs)
+        await cache.set(key, self._dump_result(result), expire=self.cache_ttl)
+        return result
+
+    def _cache_version_key(self) -> str:
+        return f'repo:{self.model.__tablename__}:version'
+
+    def _dump_result(self, result):
+        def dump(instance):
+            return {attr.key: instance.__dict__[attr.key] for attr in columns if attr.key in instance.__dict__}
+
+        columns = sa_inspect(self.model).column_attrs
+        if isinstance(result, self.model):
+            return 'instance', dump(result)
+        if isinstance(result, Sequence) and result and isinstance(result[0], self.model):
+            return 'instances', [dump(instance) for instance in result]
+        return 'value', result
+
+    def _load_result(self, data):
+        def load(values):
+            instance = self.model(**values)
+            make_transient_to_detached(instance)
+            return instance
+
+        kind, value = data
+        if kind == 'instance':
+            return load(value)
+        if kind == 'instances':
+            return [load(values) for values in value]
+        return value
+
+    def _mark_changed(self, session):
+        """
+        Records that the session wrote rows of the model, for `_invalidate_after_commit`.
+        """
+        session.info.setdefault('changed_models', set()).add(self.model)
+
+    async def _invalidate_after_commit(self, session):
+        """
+        Bumps the model's cache version once a change to it is committed: right away,
+        or when the active unit of work commits. Calls that changed nothing (lookups
+        that found their row, writes matching no rows) or left their change uncommitted
+        (`commit=False` outside a unit of work) keep the cached reads.
+        """
+        if not self.cache_ttl:
+            return
+        if session is self.db_helper.current_session:
+            # The unit of work commits everything at the end, `commit=False` writes included
+            if self.model in session.info.get('changed_models', ()) or self.model in session.info.get('committed_models', ()):
+                session.info.setdefault('after_commit', {})[self._cache_version_key()] = self.invalidate_cache
+        elif self.model in session.info.get('committed_models', ()):
+            await self.invalidate_cache()
+
+    async def invalidate_cache(self):
+        """
+        Drops every cached read of the model by bumping its cache version.
+        """
+        if cache.client is None:
+            return
+        try:
+            await cache.incr(self._cache_version_key(), 1)
+        except RedisError as e:
+            logger.error(f"Error invalidating {self.model.__name__} cache: {e}")
+
+    async def _commit(self, session):
+        """
+        Commits the session, or only flushes it when it belongs to an active
+        unit of work, which commits once at the end.
+        """
+        session.info.setdefault('committed_models', set()).update(session.info.pop('changed_models', ()))
+        if session is self.db_helper.current_session:
+            await session.flush()
+        else:
+            await session.commit()
 
     # Public Methods
     async def create[T](self, data: dict, commit=True, refresh=True) -> T:
@@ -49,12 +290,13 @@ class SqlAlchemyRepository:
         """
         return await self._with_session(self.db_create, data, commit, refresh)
 
-    async def get[T](self, **kwargs) -> T:
+    async def get[T](self, load=None, **kwargs) -> T:
         """
         Retrieves a single record by unique conditions.
 
         Args:
             kwargs: Conditions to filter the record.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             The retrieved instance.
@@ -62,7 +304,12 @@ class SqlAlchemyRepository:
         Raises:
             NoResultFound: If no record is found.
         """
-        return await self._with_session(self.db_get, **kwargs)
+        if tuple(kwargs) == ('id',) and (loader := self._loader(load)) is not None:
+            instance = await loader.load(kwargs['id'])
+            if instance is None:
+                raise BadRequest(f"{self.model.__name__} object dose not exist with {kwargs}")
+            return instance
+        return await self._cached_read(self.db_get, load=load, **kwargs)
 
     async def get_or_create(self, defaults: dict = None, commit=True, **kwargs):
         """
@@ -71,45 +318,50 @@ class SqlAlchemyRepository:
         Args:
             defaults (dict): Additional fields to use when creating a new record.
             commit (bool, optional): Whether to commit changes to the database.
-            kwargs: Conditions to locate an existing record.
+            kwargs: Conditions to locate an existing record, covered by a unique constraint.
 
         Returns:
             Tuple containing the instance and a boolean indicating if it was created.
         """
         return await self._with_session(self.db_get_or_create, defaults, commit, **kwargs)
 
-    async def filter(self, order_by=None, **filters):
+    async def filter(self, order_by=None, load=None, **filters):
         """
         Finds multiple records based on dynamic filters.
 
         Args:
             filters (dict): Conditions in the format "field__operation".
             order_by (str, optional): Order records by this field.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             List of model instances that match the filters.
         """
-        return await self._with_session(self.db_filter, order_by, **filters)
+        return await self._cached_read(self.db_filter, order_by, load=load, **filters)
 
-    async def find(self, **kwargs):
+    async def find(self, load=None, **kwargs):
         """
         Finds multiple records that match the given conditions.
 
         Args:
             kwargs: Conditions to filter the records.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             List of matching instances.
         """
-        return await self._with_session(self.db_find, **kwargs)
+        return await self._cached_read(self.db_find, load=load, **kwargs)
 
-    async def delete(self, commit=True, **kwargs):
+    async def delete(self, commit=True, hard=False, **kwargs):
         """
         Deletes a record that matches the specified conditions.
+        Records of models with a `deleted` column are only marked as deleted.
 
         Args:
             kwargs: Conditions to filter the record.
             commit (bool, optional): Whether to commit changes to the database.
+            hard (bool, optional): Whether to remove the row even if the model supports soft deletion;
+                matches rows that are already soft-deleted too.
 
         Returns:
             The deleted instance.
@@ -117,7 +369,7 @@ class SqlAlchemyRepository:
         Raises:
             NoResultFound: If no record is found.
         """
-        return await self._with_session(self.db_delete, commit, **kwargs)
+        return await self._with_session(self.db_delete, commit, hard, **kwargs)
 
     async def update_instance[T](
             self,
@@ -146,17 +398,75 @@ class SqlAlchemyRepository:
         """
         return await self._with_session(self.db_update, data, commit, **kwargs)
 
-    async def count(self, **kwargs):
+    async def update_where(self, filters: dict, values: dict, returning: Sequence[str] = None, commit=True):
+        """
+        Updates every record matching the filters with a single UPDATE statement,
+        without loading the records.
+
+        Args:
+            filters (dict): Conditions in the format "field__operation".
+            values (dict): The data to update.
+            returning (Sequence[str], optional): Columns to return for the updated records.
+            commit (bool, optional): Whether to commit changes to the database.
+
+        Returns:
+            The number of updated records, or the returned rows if `returning` is given.
+        """
+        return await self._with_session(self.db_update_where, filters, values, returning, commit)
+
+    async def delete_where(self, filters: dict, returning: Sequence[str] = None, commit=True, hard=False):
+        """
+        Deletes every record matching the filters with a single DELETE statement,
+        without loading the records. Records of models with a `deleted` column are
+        marked as deleted with a single UPDATE instead.
+
+        Args:
+            filters (dict): Conditions in the format "field__operation".
+            returning (Sequence[str], optional): Columns to return for the deleted records.
+            commit (bool, optional): Whether to commit changes to the database.
+            hard (bool, optional): Whether to remove the rows even if the model supports soft deletion;
+                matches rows that are already soft-deleted too.
+
+        Returns:
+            The number of deleted records, or the returned rows if `returning` is given.
+        """
+        return await self._with_session(self.db_delete_where, filters, returning, commit, hard)
+
+    async def count(self, mode: Literal['exact', 'estimated', 'cached'] = 'exact', ttl: int = 60, **kwargs):
         """
         Counts the number of records that match the specified conditions.
 
         Args:
-            kwargs: Conditions to filter the records.
+            mode (str): "exact" runs count(*); "estimated" uses the planner's row estimate
+                        (pg_class.reltuples without filters, EXPLAIN with filters); "cached"
+                        keeps the exact count in Redis for `ttl` seconds.
+            ttl (int): Lifetime of a cached count in seconds.
+            kwargs: Conditions in the format "field__operation".
 
         Returns:
             The count of matching records.
         """
-        return await self._with_session(self.db_count, **kwargs)
+        if mode == 'exact':
+            return await self._cached_read(self.db_count, **kwargs)
+        if mode == 'estimated':
+            return await self._with_read_session(self.db_estimated_count, **kwargs)
+        if mode != 'cached':
+            raise ValueError(f"Unsupported count mode: {mode}")
+        if cache.client is None:
+            # Not connected to Redis (e.g. scripts and tests): count exactly
+            return await self._with_read_session(self.db_count, **kwargs)
+
+        key = self._count_cache_key(kwargs)
+        if (value := await cache.get(key)) is not None:
+            return value
+
+        value = await self._with_read_session(self.db_count, **kwargs)
+        await cache.set(key, value, expire=ttl)
+        return value
+
+    def _count_cache_key(self, filters: dict) -> str:
+        digest = hashlib.sha1(json.dumps(filters, sort_keys=True, default=str).encode()).hexdigest()
+        return f'count:{self.model.__tablename__}:{digest}'
 
     async def bulk_create[T](self, objects: list[T], commit=True, ):
         """
@@ -171,6 +481,55 @@ class SqlAlchemyRepository:
         """
         return await self._with_session(self.db_bulk_create, objects, commit)
 
+    async def bulk_insert(
+            self,
+            rows: Union[Iterable[dict], AsyncIterable[dict]],
+            chunk_size: int = 1000,
+            on_conflict: Literal['nothing', 'update'] = None,
+            conflict_fields: Sequence[str] = None,
+            update_fields: Sequence[str] = None,
+            returning: bool = False,
+            commit=True,
+    ):
+        """
+        Inserts plain dictionaries with multi-row INSERT statements, without building ORM objects.
+
+        Args:
+            rows: Iterable or async iterable of data dictionaries.
+            chunk_size (int): Number of rows per INSERT statement.
+            on_conflict (str, optional): "nothing" or "update" to upsert on `conflict_fields`.
+            conflict_fields (Sequence[str], optional): Unique columns identifying a conflict.
+            update_fields (Sequence[str], optional): Columns to update on conflict, defaults to the inserted ones.
+            returning (bool): Whether to return the ids of the inserted (or upserted) rows.
+            commit (bool, optional): Whether to commit changes to the database.
+
+        Returns:
+            List of ids if `returning` is set, otherwise the number of rows sent.
+        """
+        return await self._with_session(
+            self.db_bulk_insert, rows, chunk_size, on_conflict, conflict_fields, update_fields, returning, commit
+        )
+
+    async def copy_insert(
+            self,
+            rows: Union[Iterable[dict], AsyncIterable[dict]],
+            chunk_size: int = 10000,
+            commit=True,
+    ):
+        """
+        Loads plain dictionaries with the PostgreSQL COPY protocol (asyncpg `copy_records_to_table`).
+        Meant for the largest loads; falls back to `bulk_insert` on other drivers.
+
+        Args:
+            rows: Iterable or async iterable of data dictionaries.
+            chunk_size (int): Number of rows per COPY.
+            commit (bool, optional): Whether to commit changes to the database.
+
+        Returns:
+            The number of rows copied.
+        """
+        return await self._with_session(self.db_copy_insert, rows, chunk_size, commit)
+
     async def update_or_create(self, data: dict, defaults: dict = None, commit=True, **kwargs):
         """
         Updates an existing record if it exists; otherwise, creates a new one.
@@ -179,37 +538,207 @@ class SqlAlchemyRepository:
             data (dict): Data for the new record.
             defaults (dict): Fields to update if the record exists.
             commit (bool, optional): Whether to commit changes to the database.
-            kwargs: Conditions to locate the record.
+            kwargs: Conditions to locate the record, covered by a unique constraint.
 
         Returns:
             Tuple containing the instance and a boolean indicating if it was created.
         """
         return await self._with_session(self.db_update_or_create, data, defaults, commit, **kwargs)
 
-    async def get_all(self):
+    async def stream(self, batch_size: int = 1000, load=None, **filters):
+        """
+        Iterates over the records matching the filters without loading them all into memory.
+        Rows are fetched through a server-side cursor, `batch_size` at a time.
+
+        Args:
+            batch_size (int): Number of rows fetched per round-trip.
+            filters (dict): Conditions in the format "field__operation".
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
+        Yields:
+            Model instances ordered by id.
+        """
+        async for batch in self.stream_batches(batch_size, load=load, **filters):
+            for instance in batch:
+                yield instance
+
+    async def stream_batches(self, size: int = 1000, load=None, **filters):
+        """
+        Iterates over the records matching the filters in lists of at most `size` instances.
+        Rows are fetched through a server-side cursor, one batch per round-trip.
+        Wrap it in `contextlib.aclosing` when breaking out early, so the cursor is released at once.
+
+        Args:
+            size (int): Number of instances per batch.
+            filters (dict): Conditions in the format "field__operation".
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
+        Yields:
+            Lists of model instances ordered by id.
+        """
+        load = self.load_spec(load)
+        stmt = self.cached_statement(
+            ('stream', load), filters,
+            lambda conditions: (
+                select(self.model).filter(*conditions).order_by(self.model.id).options(*self.load_options(load))
+            ),
+        )
+        async with self._session_scope(readonly=True) as session:
+            result = await session.stream(
+                stmt, filters,
+                execution_options={'yield_per': size, 'repository_method': f'{self.model.__name__}.stream_batches'},
+            )
+            try:
+                async for batch in self._unique(result, load).scalars().partitions():
+                    yield batch
+            finally:
+                await result.close()
+
+    async def values(self, *columns: str, into: Callable = None, **filters):
+        """
+        Retrieves only the given columns of the matching records, without building ORM instances.
+
+        Args:
+            columns (str): Names of the columns to select.
+            into (Callable, optional): Class (e.g. a slotted dataclass) built from each row's columns.
+            filters (dict): Conditions in the format "field__operation".
+
+        Returns:
+            List of dicts, or of `into` instances.
+        """
+        return await self._with_read_session(self.db_values, columns, into, **filters)
+
+    async def values_list(self, *columns: str, flat: bool = False, **filters):
+        """
+        Retrieves only the given columns of the matching records as lightweight rows.
+
+        Args:
+            columns (str): Names of the columns to select.
+            flat (bool): Whether to return plain values; requires a single column.
+            filters (dict): Conditions in the format "field__operation".
+
+        Returns:
+            List of `Row` tuples, or of values if `flat` is set.
+        """
+        if flat and len(columns) != 1:
+            raise ValueError("'flat' requires exactly one column")
+        return await self._with_read_session(self.db_values_list, columns, flat, **filters)
+
+    async def get_all(self, load=None):
         """
         Retrieves all records without any filtering.
 
+        Args:
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
         Returns:
             List of all instances.
         """
-        return await self._with_session(self.db_get_all)
+        return await self._cached_read(self.db_get_all, load=load)
 
-    async def paginate(self, limit: int, offset: int = 0, **kwargs):
+    async def paginate(self, limit: int, offset: int = 0, load=None, **kwargs):
         """
         Retrieves records with pagination.
 
         Args:
             limit (int): Number of records to retrieve.
             offset (int): Number of records to skip.
-            kwargs: Conditions to filter the records.
+            kwargs: Conditions in the format "field__operation".
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             List of instances for the current page.
         """
-        return await self._with_session(self.db_paginate, limit, offset, **kwargs)
+        return await self._cached_read(self.db_paginate, limit, offset, load=load, **kwargs)
+
+    async def page(
+            self,
+            params: Params,
+            count: Literal['exact', 'estimated', 'cached'] = 'exact',
+            load=None,
+            **kwargs
+    ):
+        """
+        Retrieves a `fastapi_pagination` page using limit/offset pagination.
 
-    async def get_ordered(self, order_field, descending=False, **kwargs):
+        Args:
+            params (Params): Pagination params of the request. With `HasNextParams` no count
+                             is run; one extra row is fetched to fill `has_next` instead.
+            count (str): Count mode for the total, see `count`.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+            kwargs: Conditions in the format "field__operation".
+
+        Returns:
+            A `Page` (or the page type of the params).
+        """
+        raw_params = params.to_raw_params()
+        if isinstance(params, HasNextParams):
+            items = await self.paginate(raw_params.limit + 1, raw_params.offset, load=load, **kwargs)
+            return create_page(items[:raw_params.limit], params=params, has_next=len(items) > raw_params.limit)
+
+        items = await self.paginate(raw_params.limit, raw_params.offset, load=load, **kwargs)
+        total = await self.count(count, **kwargs)
+        return create_page(items, total, params=params)
+
+    async def keyset_paginate(
+            self,
+            limit: int,
+            cursor: Optional[str] = None,
+            order_by: Sequence[str] = None,
+            descending: bool = True,
+            load=None,
+            **kwargs
+    ):
+        """
+        Retrieves records with keyset (cursor) pagination.
+
+        Args:
+            limit (int): Number of records to retrieve.
+            cursor (str, optional): Cursor returned for the previous page.
+            order_by (Sequence[str], optional): Indexed columns to order by, defaults to `keyset_order`.
+            descending (bool): Whether to sort in descending order.
+            kwargs: Conditions in the format "field__operation".
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
+        Returns:
+            Tuple of the instances for the current page and the cursor for the next page or None.
+        """
+        return await self._with_read_session(
+            self.db_keyset_paginate, limit, cursor, order_by, descending, load=load, **kwargs
+        )
+
+    async def cursor_page(
+            self,
+            params: CursorParams,
+            order_by: Sequence[str] = None,
+            descending: bool = True,
+            load=None,
+            count: Literal['exact', 'estimated', 'cached'] = 'estimated',
+            **kwargs
+    ):
+        """
+        Retrieves a `fastapi_pagination` cursor page using keyset pagination.
+
+        Args:
+            params (CursorParams): Pagination params of the request.
+            order_by (Sequence[str], optional): Indexed columns to order by, defaults to `keyset_order`.
+            descending (bool): Whether to sort in descending order.
+            kwargs: Conditions in the format "field__operation".
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+            count (str): Count mode for the total (see `count`), when the page type has one. An exact
+                count scans every matching row on every page; use `KeysetPage` for pages without a total.
+
+        Returns:
+            A `CursorPage` (or the page type configured for the route).
+        """
+        raw_params = params.to_raw_params()
+        items, next_cursor = await self.keyset_paginate(
+            raw_params.size, raw_params.cursor, order_by, descending, load=load, **kwargs
+        )
+        total = await self.count(count, **kwargs) if raw_params.include_total else None
+        return create_page(items, total, params=params, current=raw_params.cursor, next_=next_cursor)
+
+    async def get_ordered(self, order_field, descending=False, load=None, **kwargs):
         """
         Retrieves records ordered by a specified field.
 
@@ -217,23 +746,72 @@ class SqlAlchemyRepository:
             order_field: The field to order by.
             descending (bool): Whether to sort in descending order.
             kwargs: Conditions to filter the records.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             List of ordered instances.
         """
-        return await self._with_session(self.db_get_ordered, order_field, descending, **kwargs)
+        return await self._with_read_session(self.db_get_ordered, order_field, descending, load=load, **kwargs)
 
-    async def first(self, **kwargs):
+    async def first(self, load=None, **kwargs):
         """
         Retrieves the first record that matches the conditions.
 
         Args:
             kwargs: Conditions to filter the record.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             The first matching instance or None.
         """
-        return await self._with_session(self.db_first, **kwargs)
+        if tuple(kwargs) == ('id',) and (loader := self._loader(load)) is not None:
+            return await loader.load(kwargs['id'])
+        return await self._cached_read(self.db_first, load=load, **kwargs)
+
+    async def load(self, pk, load=None):
+        """
+        Retrieves a record by primary key. Within a request, lookups made in the same
+        event-loop tick (e.g. through `asyncio.gather`) are batched into one
+        `id IN (...)` query, and each key is fetched once per request until a write
+        through the repository. `get(id=...)` and `first(id=...)` take the same path.
+
+        Args:
+            pk: Primary key of the record.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
+        Returns:
+            The instance or None.
+        """
+        if (loader := self._loader(load)) is not None:
+            return await loader.load(pk)
+        return await self._cached_read(self.db_first, load=load, id=pk)
+
+    async def load_many(self, pks: Iterable, load=None) -> list:
+        """
+        Retrieves records by primary key, see `load`.
+
+        Args:
+            pks: Primary keys of the records; duplicates are fetched once.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
+
+        Returns:
+            List of instances (None for missing keys), in the order of `pks`.
+        """
+        pks = list(pks)
+        if (loader := self._loader(load)) is not None:
+            return list(await asyncio.gather(*(loader.load(pk) for pk in pks)))
+
+        found = {instance.id: instance for instance in await self._with_read_session(self.db_load_many, pks, load=load)}
+        return [found.get(pk) for pk in pks]
+
+    def _loader(self, load=None):
+        """
+        The request's batch loader for the load spec; None outside a request and inside
+        a unit of work, whose reads must go through its own session.
+        """
+        if self.db_helper.current_session is not None:
+            return None
+        return get_loader(self, self.load_spec(load))
 
     async def exists(self, **kwargs) -> bool:
         """
@@ -245,30 +823,38 @@ class SqlAlchemyRepository:
         Returns:
             bool: True if the record exists, otherwise False.
         """
-        return await self._with_session(self.db_exists, **kwargs)
+        return await self._cached_read(self.db_exists, **kwargs)
 
-    async def last(self, **kwargs):
+    async def last(self, load=None, **kwargs):
         """
         Retrieves the last record that matches the conditions.
 
         Args:
             kwargs: Conditions to filter the record.
+            load (Sequence[str] | dict, optional): Relationships to eager-load, e.g. ("author", "items__product").
 
         Returns:
             The last matching instance or None.
         """
-        return await self._with_session(self.db_last, **kwargs)
-
-    async def collect_conditions(self, filters: dict):
+        return await self._cached_read(self.db_last, load=load, **kwargs)
 
+    def lookup_plan(self, keys: tuple[str, ...]) -> tuple:
         """
-        filters: Dictionary of filters with keys in the format "field__operation".
-                     Supported operations: eq, ne, lt, lte, gt, gte, in, like, ilike.
-        :param filters:
-        :return:
+        Resolves filter keys in the format "field__operation" into (key, column, operation) triples.
+        Plans are cached per model by the key shape, so each shape is parsed only once.
+
+        Args:
+            keys: Tuple of filter keys.
+
+        Returns:
+            Tuple of (key, column, operation name) triples.
         """
-        conditions = []
-        for key, value in filters.items():
+        plan = self._lookup_plans.get(keys)
+        if plan is not None:
+            return plan
+
+        plan = []
+        for key in keys:
             # Split the field name and operation
             field_name, *operation = key.split("__")
             operation = operation[0] if operation else "eq"
@@ -277,29 +863,134 @@ class SqlAlchemyRepository:
             field = getattr(self.model, field_name, None)
             if field is None:
                 raise ValueError(f"Invalid field: {field_name}")
-
-            # Apply different filter operations
-            if operation == "eq":  # Equals
-                conditions.append(field == value)
-            elif operation == "ne":  # Not equal
-                conditions.append(field != value)
-            elif operation == "lt":  # Less than
-                conditions.append(field < value)
-            elif operation == "lte":  # Less than or equal
-                conditions.append(field <= value)
-            elif operation == "gt":  # Greater than
-                conditions.append(field > value)
-            elif operation == "gte":  # Greater than or equal
-                conditions.append(field >= value)
-            elif operation == "in":  # In list
-                conditions.append(field.in_(value))
-            elif operation == "like":  # SQL LIKE
-                conditions.append(field.like(value))
-            elif operation == "ilike":  # Case-insensitive LIKE
-                conditions.append(field.ilike(value))
-            else:
+            if operation not in LOOKUP_OPERATORS:
                 raise ValueError(f"Unsupported filter operation: {operation}")
-        return conditions
+
+            plan.append((key, field, operation))
+
+        plan = self._lookup_plans[keys] = tuple(plan)
+        return plan
+
+    async def collect_conditions(self, filters: dict, include_deleted: bool = False):
+
+        """
+        filters: Dictionary of filters with keys in the format "field__operation".
+                     Supported operations: eq, ne, lt, lte, gt, gte, in, like, ilike.
+        :param filters:
+        :param include_deleted: Whether to match soft-deleted rows too
+        :return:
+        """
+        return [
+            *(
+                LOOKUP_OPERATORS[operation](field, filters[key])
+                for key, field, operation in self.lookup_plan(tuple(filters))
+            ),
+            *(() if include_deleted else self.live_conditions()),
+        ]
+
+    def cached_statement(self, kind: str, filters: Union[Mapping, tuple[str, ...]], build):
+        """
+        Returns a statement for the given kind and filter key shape, building it once.
+
+        The conditions passed to `build` compare against bind parameters named after
+        the filter keys, so the cached statement is executed with the filters dict as
+        parameters, and SQLAlchemy reuses its compiled form. Equality filters with a
+        None value are part of the shape and render as `IS NULL` / `IS NOT NULL`,
+        since a bound NULL never compares equal.
+
+        Args:
+            kind: Name of the statement kind (e.g. "get", "exists"), including any
+                  option that changes the statement's shape.
+            filters: Filters dict, or a tuple of filter keys whose values are never None.
+            build: Callable receiving the bound conditions and returning a statement.
+
+        Returns:
+            The cached statement.
+        """
+        keys = tuple(filters)
+        plan = self.lookup_plan(keys)
+        nulls = ()
+        if isinstance(filters, Mapping):
+            nulls = tuple(
+                key for key, _, operation in plan if operation in NULL_OPERATORS and filters[key] is None
+            )
+        cache_key = (kind, keys, nulls)
+        stmt = self._statements.get(cache_key)
+        if stmt is None:
+            conditions = [
+                *(
+                    NULL_OPERATORS[operation](field) if key in nulls
+                    else LOOKUP_OPERATORS[operation](field, bindparam(key, expanding=operation == 'in'))
+                    for key, field, operation in plan
+                ),
+                *self.live_conditions(),
+            ]
+            stmt = build(conditions)
+            if len(self._statements) < self.statement_cache_size:
+                self._statements[cache_key] = stmt
+        return stmt
+
+    def load_spec(self, load=None) -> tuple:
+        """
+        Normalizes a load spec into a hashable tuple of (path, strategy) pairs.
+
+        Args:
+            load: Sequence of relationship paths (loaded with "selectin"), or a mapping
+                  of paths to one of the `LOADER_STRATEGIES`. Defaults to the model's `__load__`.
+
+        Returns:
+            Tuple of (path, strategy) pairs.
+        """
+        if load is None:
+            load = self.default_load
+        if isinstance(load, str):
+            load = (load,)
+        if isinstance(load, Mapping):
+            return tuple(load.items())
+        return tuple((path, 'selectin') for path in load)
+
+    def load_options(self, spec: tuple) -> tuple:
+        """
+        Translates a normalized load spec into loader option chains, validating every
+        path segment against the relationships of the model it starts from.
+
+        Args:
+            spec: Tuple of (path, strategy) pairs, see `load_spec`.
+
+        Returns:
+            Tuple of loader options.
+        """
+        options = self._load_options.get(spec)
+        if options is not None:
+            return options
+
+        options = []
+        for path, strategy in spec:
+            loader = LOADER_STRATEGIES.get(strategy)
+            if loader is None:
+                raise ValueError(f"Unsupported load strategy: {strategy}")
+
+            entity, option = self.model, None
+            for name in path.split("__"):
+                relationship = sa_inspect(entity).relationships.get(name)
+                if relationship is None:
+                    raise ValueError(f"Invalid relationship: {entity.__name__}.{name}")
+                attribute = getattr(entity, name)
+                option = loader(attribute) if option is None else getattr(option, loader.__name__)(attribute)
+                entity = relationship.mapper.class_
+            options.append(option)
+
+        options = self._load_options[spec] = tuple(options)
+        return options
+
+    @staticmethod
+    def _unique(result, spec: tuple):
+        """
+        Joined eager loads of collections repeat parent rows, which must be uniqued.
+        """
+        if any(strategy == 'joined' for _, strategy in spec):
+            return result.unique()
+        return result
 
     async def apply_filters(self, query, filters: dict):
         """
@@ -314,63 +1005,168 @@ class SqlAlchemyRepository:
             Updated query with applied filters.
         """
         conditions = await self.collect_conditions(filters)
-        return query.filter(and_(*conditions))
+        return query.filter(*conditions)
 
     async def db_create(self, session, data: dict, commit=True, refresh=True):
         instance = self.model(**data)
         session.add(instance)
+        self._mark_changed(session)
         if commit:
-            await session.commit()
+            await self._commit(session)
         if refresh:
             await session.refresh(instance)
 
         return instance
 
-    async def db_get(self, session, **kwargs):
-        conditions = await self.collect_conditions(kwargs)
-        stmt = select(self.model).filter(*conditions)
-        result = await session.execute(stmt)
-        instance = result.scalar_one_or_none()
+    async def db_get(self, session, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = self.cached_statement(
+            ('get', load), kwargs,
+            lambda conditions: select(self.model).filter(*conditions).options(*self.load_options(load)),
+        )
+        result = await session.execute(stmt, kwargs)
+        instance = self._unique(result, load).scalar_one_or_none()
         if instance is None:
             raise BadRequest(f"{self.model.__name__} object dose not exist with {kwargs}")
         return instance
 
-    async def db_get_or_create(self, session, defaults: dict = None, commit=True, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs)
-        result = await session.execute(stmt)
-        instance = result.scalar_one_or_none()
-        if instance:
-            return instance, False
+    def insert(self, table):
+        """
+        INSERT of the database's dialect, supporting ON CONFLICT on PostgreSQL and SQLite.
+        """
+        if self.db_helper.engine.dialect.name == 'sqlite':
+            return sqlite_insert(table)
+        return pg_insert(table)
 
-        combined_data = {**kwargs, **(defaults or {})}
-        instance = self.model(**combined_data)
-        session.add(instance)
+    def unique_keys(self) -> set[frozenset[str]]:
+        """
+        Column sets of the model's primary key, unique constraints and unique indexes.
+        """
+        if self._unique_keys is None:
+            table = self.model.__table__
+            constraints = [
+                *(constraint for constraint in table.constraints if isinstance(constraint, (PrimaryKeyConstraint, UniqueConstraint))),
+                *(index for index in table.indexes if index.unique),
+            ]
+            type(self)._unique_keys = {
+                frozenset(column.key for column in constraint.columns) for constraint in constraints if constraint.columns
+            }
+        return self._unique_keys
+
+    def _conflict_where(self):
+        """
+        Unique indexes of soft-delete models are partial, and ON CONFLICT must name their predicate.
+        """
+        return and_(*self.live_conditions()) if self.soft_delete else None
+
+    async def db_upsert_one(self, session, values: dict, conflict_fields: Sequence[str], update_values: dict):
+        """
+        Inserts one row or updates the row conflicting on `conflict_fields`, in a single
+        INSERT ... ON CONFLICT DO UPDATE ... RETURNING round-trip.
+
+        Returns:
+            Tuple containing the instance and a boolean indicating if it was created.
+
+        Raises:
+            ValueError: If `conflict_fields` are not exactly the columns of a unique constraint or index,
+                which ON CONFLICT needs to detect the existing row.
+        """
+        if frozenset(conflict_fields) not in self.unique_keys():
+            raise ValueError(
+                f"{self.model.__name__} has no unique constraint or index on exactly ({', '.join(conflict_fields)}); "
+                f"get_or_create and update_or_create look records up by the columns of one"
+            )
+        stmt = self.insert(self.model).values(**values)
+        if update_values:
+            set_ = {
+                **update_values,
+                **{
+                    column.key: stmt.excluded[column.key] for column in self.model.__table__.columns
+                    if column.onupdate is not None and column.key not in update_values
+                },
+            }
+        else:
+            # A no-op update still locks the existing row and makes RETURNING yield it
+            set_ = {field: stmt.excluded[field] for field in conflict_fields}
+
+        stmt = (
+            stmt.on_conflict_do_update(index_elements=list(conflict_fields), index_where=self._conflict_where(), set_=set_)
+            .execution_options(populate_existing=True)
+        )
+        if self.db_helper.engine.dialect.name == 'postgresql':
+            # xmax is 0 only for a freshly inserted row version
+            result = await session.execute(stmt.returning(self.model, literal_column('xmax = 0')))
+            instance, created = result.one()
+            return instance, created
+
+        # Elsewhere DO NOTHING returns a row only when it inserted one, and the insert holds the write lock
+        # by then, unlike a lookup before it, which concurrent callers would all see come back empty
+        inserted = await session.execute(
+            self.insert(self.model).values(**values)
+            .on_conflict_do_nothing(index_elements=list(conflict_fields), index_where=self._conflict_where())
+            .returning(self.model)
+            .execution_options(populate_existing=True)
+        )
+        if (instance := inserted.scalar_one_or_none()) is not None:
+            return instance, True
+        result = await session.execute(stmt.returning(self.model))
+        return result.scalar_one(), False
+
+    async def db_get_or_create(self, session, defaults: dict = None, commit=True, **kwargs):
+        instance, created = await self.db_upsert_one(session, {**kwargs, **(defaults or {})}, tuple(kwargs), {})
+        if created:
+            self._mark_changed(session)
 
         if commit:
-            await session.commit()
-        return instance, True
-
-    async def db_filter(self, session, order_by=None, **filters):
-        ordering = order_by or [self.model.id.desc()]
-        query = select(self.model)
-        query = await self.apply_filters(query, filters)
-        query = query.order_by(*ordering)
-        result = await session.execute(query)
-        return result.scalars().all()
-
-    async def db_find(self, session, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs)
+            await self._commit(session)
+        return instance, created
+
+    async def db_filter(self, session, order_by=None, load=None, **filters):
+        load = self.load_spec(load)
+        if order_by:
+            query = select(self.model).options(*self.load_options(load))
+            query = await self.apply_filters(query, filters)
+            query = query.order_by(*order_by)
+            result = await session.execute(query)
+        else:
+            query = self.cached_statement(
+                ('filter', load), filters,
+                lambda conditions: (
+                    select(self.model)
+                    .filter(*conditions)
+                    .order_by(self.model.id.desc())
+                    .options(*self.load_options(load))
+                ),
+            )
+            result = await session.execute(query, filters)
+        return self._unique(result, load).scalars().all()
+
+    async def db_find(self, session, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = self.select().filter_by(**kwargs).options(*self.load_options(load))
         result = await session.execute(stmt)
-        return result.scalars().all()
+        return self._unique(result, load).scalars().all()
+
+    def soft_delete_values(self) -> dict:
+        values = {'deleted': True}
+        if hasattr(self.model, 'deleted_at'):
+            values['deleted_at'] = utcnow()
+        return values
 
-    async def db_delete(self, session, commit=True, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs)
+    async def db_delete(self, session, commit=True, hard=False, **kwargs):
+        # A hard delete also purges rows that were already soft-deleted
+        stmt = (select(self.model) if hard else self.select()).filter_by(**kwargs)
         result = await session.execute(stmt)
         instance = result.scalar_one_or_none()
         if instance:
-            await session.delete(instance)
+            if self.soft_delete and not hard:
+                for key, value in self.soft_delete_values().items():
+                    setattr(instance, key, value)
+            else:
+                await session.delete(instance)
+            self._mark_changed(session)
             if commit:
-                await session.commit()
+                await self._commit(session)
             return instance
         else:
             raise NoResultFound(f"{self.model.__name__} not found with {kwargs}")
@@ -388,22 +1184,200 @@ class SqlAlchemyRepository:
         result = await session.execute(stmt)
         instance = result.scalar_one_or_none()
         if instance:
+            self._mark_changed(session)
             if commit:
-                await session.commit()
+                await self._commit(session)
             return instance
         else:
             raise BadRequest(f"{self.model.__name__} not found with {kwargs}")
 
-    async def db_count(self, session, **kwargs):
-        stmt = select(func.count()).select_from(self.model).filter_by(**kwargs)
+    async def _execute_where(self, session, stmt, returning: Sequence[str] = None, commit=True):
+        stmt = stmt.execution_options(synchronize_session=False)
+        if returning:
+            stmt = stmt.returning(*(getattr(self.model, field) for field in returning))
+
         result = await session.execute(stmt)
+        rows = result.all() if returning else None
+        if rows if returning else result.rowcount:
+            self._mark_changed(session)
+        if commit:
+            await self._commit(session)
+        return rows if returning else result.rowcount
+
+    async def db_update_where(self, session, filters: dict, values: dict, returning: Sequence[str] = None, commit=True):
+        conditions = await self.collect_conditions(filters)
+        stmt = update(self.model).where(*conditions).values(**values)
+        return await self._execute_where(session, stmt, returning, commit)
+
+    async def db_delete_where(
+            self,
+            session,
+            filters: dict,
+            returning: Sequence[str] = None,
+            commit=True,
+            hard=False,
+    ):
+        conditions = await self.collect_conditions(filters, include_deleted=hard)
+        if self.soft_delete and not hard:
+            stmt = update(self.model).where(*conditions).values(**self.soft_delete_values())
+        else:
+            stmt = delete(self.model).where(*conditions)
+        return await self._execute_where(session, stmt, returning, commit)
+
+    async def db_count(self, session, **kwargs):
+        stmt = self.cached_statement(
+            'count', kwargs,
+            lambda conditions: select(func.count()).select_from(self.model).filter(*conditions),
+        )
+        result = await session.execute(stmt, kwargs)
         return result.scalar()
 
+    async def db_estimated_count(self, session, **kwargs):
+        connection = await session.connection()
+        if connection.dialect.name != 'postgresql':
+            return await self.db_count(session, **kwargs)
+
+        if not kwargs and not self.soft_delete:
+            table = connection.dialect.identifier_preparer.format_table(self.model.__table__)
+            estimate = await session.scalar(
+                text('SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)'),
+                {'table': table},
+            )
+            # reltuples is -1 until the table has been vacuumed or analyzed
+            if estimate is None or estimate < 0:
+                return await self.db_count(session)
+            return estimate
+
+        conditions = await self.collect_conditions(kwargs)
+        query = select(self.model.id).filter(*conditions).compile(
+            dialect=connection.dialect, compile_kwargs={'literal_binds': True},
+        )
+        result = await connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {query}')
+        plan = result.scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return plan[0]['Plan']['Plan Rows']
+
     async def db_bulk_create[T](self, session, objects: list[T], commit=True):
         session.add_all(objects)
-        await session.commit()
+        if objects:
+            self._mark_changed(session)
+        if commit:
+            await self._commit(session)
         return objects
 
+    def insert_statement(
+            self,
+            fields: Iterable[str],
+            on_conflict: Literal['nothing', 'update'] = None,
+            conflict_fields: Sequence[str] = None,
+            update_fields: Sequence[str] = None,
+    ):
+        """
+        Builds an INSERT for the model table, optionally with an ON CONFLICT clause.
+        Columns with an `onupdate` are refreshed from the excluded row on conflict.
+        """
+        table = self.model.__table__
+        stmt = self.insert(table)
+        if on_conflict is None:
+            return stmt
+
+        if not conflict_fields:
+            raise ValueError("'conflict_fields' must be provided for upserts")
+        if on_conflict == 'nothing':
+            return stmt.on_conflict_do_nothing(index_elements=conflict_fields, index_where=self._conflict_where())
+        if on_conflict != 'update':
+            raise ValueError(f"Unsupported conflict action: {on_conflict}")
+
+        if update_fields is None:
+            primary_keys = {column.key for column in table.primary_key}
+            update_fields = [field for field in fields if field not in conflict_fields and field not in primary_keys]
+        update_fields = {*update_fields, *(column.key for column in table.columns if column.onupdate is not None)}
+        return stmt.on_conflict_do_update(
+            index_elements=conflict_fields,
+            index_where=self._conflict_where(),
+            set_={field: stmt.excluded[field] for field in update_fields},
+        )
+
+    async def db_bulk_insert(
+            self,
+            session,
+            rows: Union[Iterable[dict], AsyncIterable[dict]],
+            chunk_size: int = 1000,
+            on_conflict: Literal['nothing', 'update'] = None,
+            conflict_fields: Sequence[str] = None,
+            update_fields: Sequence[str] = None,
+            returning: bool = False,
+            commit=True,
+    ):
+        stmt = None
+        ids, count = [], 0
+        # Ids generated in Python are known without RETURNING, unless a conflict may keep another row's id
+        known_ids = self.id_generator is not None and on_conflict is None
+        async for chunk in iter_chunks(rows, chunk_size):
+            if self.id_generator is not None:
+                chunk = [row if row.get('id') is not None else {**row, 'id': self.id_generator.next_id()} for row in chunk]
+            if stmt is None:
+                stmt = self.insert_statement(chunk[0], on_conflict, conflict_fields, update_fields)
+                if returning and not known_ids:
+                    stmt = stmt.returning(self.model.__table__.c.id)
+
+            # executemany is batched into multi-row INSERT ... VALUES by SQLAlchemy's insertmanyvalues
+            result = await session.execute(stmt, chunk)
+            if returning:
+                ids.extend([row['id'] for row in chunk] if known_ids else result.scalars().all())
+            count += len(chunk)
+
+        if count:
+            self._mark_changed(session)
+        if commit:
+            await self._commit(session)
+        return ids if returning else count
+
+    async def db_copy_insert(
+            self,
+            session,
+            rows: Union[Iterable[dict], AsyncIterable[dict]],
+            chunk_size: int = 10000,
+            commit=True,
+    ):
+        connection = await session.connection()
+        if connection.dialect.driver != 'asyncpg':
+            return await self.db_bulk_insert(session, rows, chunk_size, commit=commit)
+
+        table = self.model.__table__
+        driver_connection = (await connection.get_raw_connection()).driver_connection
+        keys = columns = defaults = None
+        count = 0
+        async for chunk in iter_chunks(rows, chunk_size):
+            if columns is None:
+                # COPY skips Python-side defaults, so evaluate them for columns missing from the rows
+                defaults = {
+                    column.key: column.default for column in table.columns
+                    if column.key not in chunk[0] and column.default is not None
+                    and (column.default.is_callable or column.default.is_scalar)
+                }
+                keys = list(chunk[0])
+                columns = [*keys, *defaults]
+
+            records = [
+                (
+                    *(row[key] for key in keys),
+                    *(default.arg(None) if default.is_callable else default.arg for default in defaults.values()),
+                )
+                for row in chunk
+            ]
+            await driver_connection.copy_records_to_table(
+                table.name, records=records, columns=columns, schema_name=table.schema,
+            )
+            count += len(records)
+
+        if count:
+            self._mark_changed(session)
+        if commit:
+            await self._commit(session)
+        return count
+
     async def db_update_instance[T](
             self,
             session,
@@ -416,66 +1390,168 @@ class SqlAlchemyRepository:
         if instance is None:
             instance = await self.db_get(session, **kwargs)
         else:
-            await session.merge(instance)
+            # Detached instances (e.g. served from the query cache) are tracked through their merged copy
+            instance = await session.merge(instance)
 
         for key, value in data.items():
             setattr(instance, key, value)
+        if session.is_modified(instance):
+            self._mark_changed(session)
 
         if commit:
-            await session.commit()
+            await self._commit(session)
 
         if refresh:
             await session.refresh(instance)
         return instance
 
     async def db_update_or_create(self, session, data: dict, defaults: dict = None, commit=True, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs)
-        result = await session.execute(stmt)
-        instance = result.scalar_one_or_none()
+        instance, created = await self.db_upsert_one(session, {**kwargs, **data}, tuple(kwargs), defaults or {})
+        self._mark_changed(session)
 
-        if instance:
-            for key, value in (defaults or {}).items():
-                setattr(instance, key, value)
-            created = False
-        else:
-            instance = self.model(**data)
-            session.add(instance)
-            created = True
         if commit:
-            await session.commit()
+            await self._commit(session)
         return instance, created
 
-    async def db_get_all(self, session):
-        stmt = select(self.model)
+    def _values_statement(self, columns: Sequence[str], filters: dict):
+        if not columns:
+            raise ValueError("At least one column must be given")
+
+        def build(conditions):
+            fields = []
+            for name in columns:
+                field = getattr(self.model, name, None)
+                if field is None:
+                    raise ValueError(f"Invalid field: {name}")
+                fields.append(field)
+            return select(*fields).filter(*conditions).order_by(self.model.id.desc())
+
+        return self.cached_statement(f'values:{",".join(columns)}', filters, build)
+
+    async def db_values(self, session, columns: Sequence[str], into: Callable = None, **filters):
+        result = await session.execute(self._values_statement(columns, filters), filters)
+        if into is not None:
+            return [into(**row) for row in result.mappings()]
+        return [dict(row) for row in result.mappings()]
+
+    async def db_values_list(self, session, columns: Sequence[str], flat: bool = False, **filters):
+        result = await session.execute(self._values_statement(columns, filters), filters)
+        return result.scalars().all() if flat else result.all()
+
+    async def db_get_all(self, session, load=None):
+        load = self.load_spec(load)
+        stmt = self.select().options(*self.load_options(load))
         result = await session.execute(stmt)
-        return result.scalars().all()
+        return self._unique(result, load).scalars().all()
 
-    async def db_last(self, session, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs).order_by(self.model.id.desc()).limit(1)
+    async def db_last(self, session, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = (
+            self.select()
+            .filter_by(**kwargs)
+            .order_by(self.model.id.desc())
+            .limit(1)
+            .options(*self.load_options(load))
+        )
         result = await session.execute(stmt)
-        return result.scalar_one_or_none()
+        return self._unique(result, load).scalar_one_or_none()
 
-    async def db_first(self, session, **kwargs):
-        conditions = await self.collect_conditions(kwargs)
-        stmt = select(self.model).filter(*conditions).limit(1)
-        result = await session.execute(stmt)
-        return result.scalar_one_or_none()
+    async def db_first(self, session, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = self.cached_statement(
+            ('first', load), kwargs,
+            lambda conditions: select(self.model).filter(*conditions).limit(1).options(*self.load_options(load)),
+        )
+        result = await session.execute(stmt, kwargs)
+        return self._unique(result, load).scalar_one_or_none()
+
+    async def db_load_many(self, session, pks: Sequence, load=None):
+        load = self.load_spec(load)
+        stmt = self.cached_statement(
+            ('load', load), ('id__in',),
+            lambda conditions: select(self.model).filter(*conditions).options(*self.load_options(load)),
+        )
+        result = await session.execute(stmt, {'id__in': list(set(pks))})
+        return self._unique(result, load).scalars().all()
 
     async def db_exists(self, session, **kwargs):
-        conditions = await self.collect_conditions(kwargs)
-        stmt = select(exists().where(*conditions))
-        return await session.scalar(stmt)
-
-    async def db_paginate(self, session, limit: int, offset: int, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs).limit(limit).offset(offset)
-        result = await session.execute(stmt)
-        return result.scalars().all()
+        stmt = self.cached_statement(
+            'exists', kwargs,
+            lambda conditions: select(exists().where(*conditions)),
+        )
+        return await session.scalar(stmt, kwargs)
+
+    async def db_paginate(self, session, limit: int, offset: int, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = self.cached_statement(
+            ('paginate', load), kwargs,
+            lambda conditions: (
+                select(self.model)
+                .filter(*conditions)
+                .order_by(self.model.id.desc())
+                .limit(bindparam('_limit'))
+                .offset(bindparam('_offset'))
+                .options(*self.load_options(load))
+            ),
+        )
+        result = await session.execute(stmt, {**kwargs, '_limit': limit, '_offset': offset})
+        return self._unique(result, load).scalars().all()
 
-    async def db_get_ordered(self, session, order_field, descending=False, **kwargs):
-        stmt = select(self.model).filter_by(**kwargs)
+    async def db_keyset_paginate(
+            self,
+            session,
+            limit: int,
+            cursor: Optional[str] = None,
+            order_by: Sequence[str] = None,
+            descending: bool = True,
+            load=None,
+            **kwargs
+    ):
+        load = self.load_spec(load)
+        order_by = tuple(order_by or self.keyset_order)
+        columns = [getattr(self.model, field) for field in order_by]
+        params = {**kwargs, '_limit': limit + 1}
+
+        def build(conditions):
+            if cursor:
+                after = tuple_(*(bindparam(f'_cursor_{i}', type_=c.type) for i, c in enumerate(columns)))
+                conditions.append(tuple_(*columns) < after if descending else tuple_(*columns) > after)
+                if len(columns) > 1:
+                    # Row comparisons do not prune partitions; a plain bound on the leading column does
+                    first = bindparam('_cursor_0', type_=columns[0].type)
+                    conditions.append(columns[0] <= first if descending else columns[0] >= first)
+            ordering = [column.desc() for column in columns] if descending else columns
+            return (
+                select(self.model)
+                .filter(*conditions)
+                .order_by(*ordering)
+                .limit(bindparam('_limit'))
+                .options(*self.load_options(load))
+            )
+
+        stmt = self.cached_statement(
+            (f'keyset:{",".join(order_by)}:{descending}:{bool(cursor)}', load), kwargs, build,
+        )
+        if cursor:
+            for i, value in enumerate(decode_cursor(cursor, columns, descending)):
+                params[f'_cursor_{i}'] = value
+
+        result = await session.execute(stmt, params)
+        items = self._unique(result, load).scalars().all()
+
+        next_cursor = None
+        if len(items) > limit:
+            items = items[:limit]
+            last = items[-1]
+            next_cursor = encode_cursor(columns, [getattr(last, column.key) for column in columns], descending)
+        return items, next_cursor
+
+    async def db_get_ordered(self, session, order_field, descending=False, load=None, **kwargs):
+        load = self.load_spec(load)
+        stmt = self.select().filter_by(**kwargs).options(*self.load_options(load))
         if descending:
             stmt = stmt.order_by(getattr(self.model, order_field).desc())
         else:
             stmt = stmt.order_by(getattr(self.model, order_field))
         result = await session.execute(stmt)
-        return result.scalars().all()
+        return self._unique(result, load).scalars().all()
@@ -1,8 +1,49 @@
+import logging
+
+from redis.exceptions import RedisError
+
+from config.db.ids import snowflake
+from config.redis import cache
+from config.settings import DB_SETTINGS
+
+logger = logging.getLogger(__name__)
 
 
 async def on_startup():
-    pass
+    await cache.connect()
+    await lease_worker_id()
+    if DB_SETTINGS.DB_MAINTAIN_PARTITIONS_ON_STARTUP:
+        await maintain_partitions_on_startup()
 
 
 async def on_shutdown():
-    pass
\ No newline at end of file
+    try:
+        await snowflake.release(cache.client)
+    except RedisError as e:
+        logger.error(f"Error releasing the Snowflake worker id: {e}")
+    await cache.disconnect()
+
+
+async def lease_worker_id():
+    # Imported here, as the check needs every model imported first
+    from models import Base
+
+    if not any(getattr(mapper.class_, '__id_generator__', None) is snowflake for mapper in Base.registry.mappers):
+        # Nothing generates Snowflake ids, so processes sharing DB_WORKER_ID (e.g. gunicorn workers) may still start
+        return
+    try:
+        await snowflake.lease(cache.client)
+    except RedisError as e:
+        # Generating Snowflake ids then raises, instead of risking ids shared with another process
+        logger.error(f"Error leasing a Snowflake worker id: {e}")
+
+
+async def maintain_partitions_on_startup():
+    # Imported here, as the maintenance jobs need every model imported first
+    from config.db.maintenance import maintain_partitions
+
+    try:
+        await maintain_partitions()
+    except Exception as e:
+        # Serving requests that do not touch partitioned tables beats not starting at all
+        logger.error(f"Error creating partitions on startup: {e}")
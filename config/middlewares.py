@@ -0,0 +1,322 @@
+__all__ = (
+    'BatchLoaderMiddleware',
+    'RequestDeadlineMiddleware',
+    'ResponseCacheMiddleware',
+)
+
+import asyncio
+import hashlib
+import logging
+from contextlib import nullcontext, suppress
+from typing import Optional
+
+from fastapi.security.base import SecurityBase
+from starlette import status
+from starlette.responses import JSONResponse
+from starlette.routing import Match
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+from config.db import batch_loading, deadline_scope
+from config.redis import cache
+from config.redis.responses import ResponseCachePolicy, pack_response, response_cache_key, tag_version_key, unpack_response
+from config.settings import APP_SETTINGS, REDIS_SETTINGS
+from utils.jwt import get_decoded
+
+logger = logging.getLogger(__name__)
+
+
+def has_security_dependencies(dependant) -> bool:
+    """
+    :return: Whether a FastAPI dependant, or any dependency below it, is a security scheme (HTTPBearer etc.)
+    """
+    if dependant is None:
+        return False
+    return isinstance(dependant.call, SecurityBase) or any(has_security_dependencies(sub) for sub in dependant.dependencies)
+
+
+class BatchLoaderMiddleware:
+    """
+    Gives every HTTP request its own primary-key batch loaders. WebSocket connections get
+    none: a loader lives as long as its scope, so one per connection would keep every row
+    it loaded, and serve them stale, until the client disconnects.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with batch_loading():
+            await self.app(scope, receive, send)
+
+
+class RequestDeadlineMiddleware:
+    """
+    Runs every HTTP request under a deadline of `seconds` (0 disables it; routes can replace
+    it with the `deadline` dependency), which sessions apply as the statement timeout.
+    The handler, and with it any in-flight query, is cancelled when the deadline passes
+    (answering 504) or the client disconnects before the response is complete.
+    Background tasks, which run after the response, are left alone. The request body is
+    passed through as the handler reads it; disconnects are watched for once it is read.
+    """
+
+    def __init__(self, app: ASGIApp, seconds: float = APP_SETTINGS.REQUEST_DEADLINE_SECONDS):
+        self.app = app
+        self.seconds = seconds
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        response_started = response_complete = False
+        body_complete, disconnected = asyncio.Event(), asyncio.Event()
+        # Requests without a body only get an empty message, which the listener reads and discards
+        pending: list[Message] = []
+        if not self.has_body(scope):
+            pending.append({'type': 'http.request', 'body': b'', 'more_body': False})
+            body_complete.set()
+
+        async def handler_receive() -> Message:
+            if pending:
+                return pending.pop()
+            if body_complete.is_set():
+                # Past the body only a disconnect can come, noticed by the listener
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            # Body chunks are read only when the handler asks, so the server's flow control still applies
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                disconnected.set()
+                body_complete.set()
+            elif not message.get('more_body', False):
+                body_complete.set()
+            return message
+
+        async def tracking_send(message: Message):
+            nonlocal response_started, response_complete
+            if message['type'] == 'http.response.start':
+                response_started = True
+            elif message['type'] == 'http.response.body' and not message.get('more_body', False):
+                response_complete = True
+            await send(message)
+
+        with deadline_scope(self.seconds) if self.seconds else nullcontext() as request_deadline:
+            handler = asyncio.ensure_future(self.app(scope, handler_receive, tracking_send))
+            listener = asyncio.ensure_future(self.listen_for_disconnect(receive, body_complete, disconnected))
+            try:
+                timed_out = await self.supervise(handler, listener, request_deadline, lambda: response_complete)
+            finally:
+                listener.cancel()
+                if not handler.done():
+                    handler.cancel()
+                    with suppress(asyncio.CancelledError):
+                        await handler
+
+        if timed_out and not response_started:
+            response = JSONResponse({'detail': 'Request deadline exceeded'}, status.HTTP_504_GATEWAY_TIMEOUT)
+            await response(scope, receive, send)
+        elif handler.done() and not handler.cancelled():
+            handler.result()
+
+    @staticmethod
+    def has_body(scope: Scope) -> bool:
+        for name, value in scope['headers']:
+            name = name.lower()
+            if name == b'transfer-encoding' or (name == b'content-length' and value.strip() not in (b'', b'0')):
+                return True
+        return False
+
+    @staticmethod
+    async def listen_for_disconnect(receive: Receive, body_complete: asyncio.Event, disconnected: asyncio.Event):
+        """
+        Awaits `receive` once the handler has read the whole body, to notice a disconnect
+        even while the handler is busy with a query.
+        """
+        await body_complete.wait()
+        while not disconnected.is_set():
+            if (await receive())['type'] == 'http.disconnect':
+                disconnected.set()
+
+    @staticmethod
+    async def supervise(handler: asyncio.Future, listener: asyncio.Future, request_deadline, is_complete) -> bool:
+        """
+        Waits for the handler, or until it must be abandoned.
+
+        :return: Whether the deadline passed
+        """
+        watched = {handler, listener}
+        while True:
+            timeout = None
+            if request_deadline is not None and not is_complete():
+                timeout = max(request_deadline.remaining(), 0)
+
+            done, _ = await asyncio.wait(watched, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if handler in done:
+                return False
+            if listener in done:
+                watched.discard(listener)
+                if not is_complete():
+                    return False
+            elif not done and not is_complete() and request_deadline.remaining() <= 0:
+                return True
+
+
+class ResponseCacheMiddleware:
+    """
+    Serves GET routes decorated with `cache_response` from Redis. Responses are keyed on
+    the path, the sorted query, the policy's vary headers and, for private routes, the
+    user id of the token, and carry a strong ETag of their body: a matching `If-None-Match`
+    is answered with 304 without running the handler. Only complete 200 responses of at
+    most `max_body_size` bytes that set no cookies are stored.
+    Install it inside CORSMiddleware, so cached responses hold no per-origin headers.
+
+    A cached response is sent without running the route: neither its dependencies nor the
+    permission checks of the services it calls run. Private routes only get the token's
+    signature and expiry checked here, so a user keeps receiving their cached responses
+    for up to `ttl` after losing access. Shared (non-private) caching is refused for routes
+    with security dependencies: they always run, uncached.
+    """
+
+    def __init__(self, app: ASGIApp, max_body_size: int = REDIS_SETTINGS.REDIS_RESPONSE_CACHE_MAX_BYTES):
+        self.app = app
+        self.max_body_size = max_body_size
+        # Whether each route (by id, as routes live as long as the app) is refused shared caching
+        self.refused_routes: dict[int, bool] = {}
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope['type'] != 'http' or scope['method'] != 'GET' or cache.client is None:
+            await self.app(scope, receive, send)
+            return
+
+        route = self.find_route(scope)
+        policy: Optional[ResponseCachePolicy] = getattr(getattr(route, 'endpoint', None), '__response_cache__', None)
+        if policy is None or (not policy.private and self.refuse_shared(route)):
+            await self.app(scope, receive, send)
+            return
+
+        headers = {name.decode('latin-1').lower(): value.decode('latin-1') for name, value in scope['headers']}
+        user_id = None
+        if policy.private:
+            user_id = self.user_id(headers)
+            if user_id is None:
+                # Let the route answer unauthenticated requests itself
+                await self.app(scope, receive, send)
+                return
+
+        tags = (*policy.tags, route.path)
+        versions = (await cache.get_many([tag_version_key(tag) for tag in tags])).values()
+        key = response_cache_key(scope['path'], scope['query_string'], headers, policy, versions, user_id)
+
+        if (entry := await cache.get(key)) is not None:
+            try:
+                status_code, response_headers, body, etag = unpack_response(entry)
+            except ValueError as e:
+                # E.g. written in an older layout: answer it as a miss, which overwrites it
+                logger.error(f"Error reading cached response {key}: {e}")
+            else:
+                await self.respond(send, headers, status_code, response_headers, body, etag, policy, b'HIT')
+                return
+
+        start: Optional[Message] = None
+        chunks: list[bytes] = []
+        size = 0
+        passthrough = complete = False
+
+        async def capture(message: Message):
+            nonlocal start, size, passthrough, complete
+            if passthrough:
+                await send(message)
+            elif message['type'] == 'http.response.start':
+                start = message
+                if message['status'] != 200 or any(name.lower() == b'set-cookie' for name, _ in message.get('headers', [])):
+                    passthrough = True
+                    await send(message)
+            elif message['type'] == 'http.response.body':
+                chunks.append(message.get('body', b''))
+                size += len(chunks[-1])
+                more_body = message.get('more_body', False)
+                if size > self.max_body_size:
+                    # Too large to keep: send what was held back and stream the rest
+                    passthrough = True
+                    await send(start)
+                    await send({'type': 'http.response.body', 'body': b''.join(chunks), 'more_body': more_body})
+                elif not more_body:
+                    complete = True
+            else:
+                await send(message)
+
+        await self.app(scope, receive, capture)
+        if passthrough or not complete:
+            return
+
+        body = b''.join(chunks)
+        etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        replaced = {b'etag', b'cache-control', b'vary'}
+        response_headers = [(name, value) for name, value in start.get('headers', []) if name.lower() not in replaced]
+        await self.respond(send, headers, start['status'], response_headers, body, etag, policy, b'MISS')
+        await cache.set(key, pack_response(start['status'], response_headers, body, etag), expire=policy.ttl)
+
+    @staticmethod
+    def find_route(scope: Scope):
+        """
+        :return: The route the router will dispatch the request to, if any
+        """
+        for route in scope['app'].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return route
+        return None
+
+    def refuse_shared(self, route) -> bool:
+        """
+        :return: Whether the route is protected by security dependencies, which a shared cached response would skip
+        """
+        refused = self.refused_routes.get(id(route))
+        if refused is None:
+            refused = self.refused_routes[id(route)] = has_security_dependencies(getattr(route, 'dependant', None))
+            if refused:
+                logger.error(
+                    f"Not caching {route.path}: it has security dependencies, which a shared cached response "
+                    f"would skip; use cache_response(private=True) if every authenticated user may see it"
+                )
+        return refused
+
+    @staticmethod
+    def user_id(headers: dict[str, str]) -> Optional[int]:
+        scheme, _, token = headers.get('authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return None
+        payload = get_decoded(token)
+        return payload.get('id') if payload else None
+
+    @staticmethod
+    def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+        if not if_none_match:
+            return False
+        # If-None-Match uses the weak comparison, so a W/ prefix is ignored
+        candidates = {candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')}
+        return '*' in candidates or etag in candidates
+
+    @staticmethod
+    async def respond(send: Send, request_headers, status_code, response_headers, body, etag, policy, cache_status):
+        vary = [*policy.vary, 'authorization'] if policy.private else list(policy.vary)
+        extra = [
+            (b'etag', etag.encode('latin-1')),
+            (b'cache-control', policy.cache_control.encode('latin-1')),
+            (b'x-cache', cache_status),
+        ]
+        if vary:
+            extra.append((b'vary', ', '.join(vary).encode('latin-1')))
+
+        if ResponseCacheMiddleware.etag_matches(request_headers.get('if-none-match'), etag):
+            await send({'type': 'http.response.start', 'status': status.HTTP_304_NOT_MODIFIED, 'headers': extra})
+            await send({'type': 'http.response.body', 'body': b''})
+            return
+
+        await send({'type': 'http.response.start', 'status': status_code, 'headers': [*response_headers, *extra]})
+        await send({'type': 'http.response.body', 'body': body})
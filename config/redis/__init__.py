@@ -1,2 +1,6 @@
 from .conn import *
-from .cache import *
\ No newline at end of file
+from .cache import *
+from .decorators import *
+from .codecs import *
+from .near import *
+from .responses import *
\ No newline at end of file
@@ -1,110 +1,311 @@
 __all__ = (
     'cache',
     'AsyncRedisCache',
+    'CachePipeline',
 )
 
-import json
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from datetime import timedelta
-from typing import Optional, Union, Dict
+from typing import Any, Callable, Iterable, Optional, Union, Dict
 
 import redis.asyncio as redis
 
+from .codecs import CacheSerializer
 from .conn import redis_pool
+from .near import NearCache
+from ..settings import REDIS_SETTINGS
 
 logger = logging.getLogger(__name__)
 
 
 class AsyncRedisCache:
-    ENCODE_BOOL_TYPES = {
-        True: 'true',
-        False: 'false',
-    }
-    DECODE_BOOL_TYPES = {
-        'true': True,
-        'false': False,
-    }
-
-    def __init__(self, pool):
+    # Published on the invalidation channel instead of a key to clear every near cache
+    CLEAR_ALL = '*'
+
+    def __init__(
+            self,
+            pool,
+            near_cache: Optional[NearCache] = None,
+            invalidation_channel: str = 'cache:invalidate',
+            serializer: Optional[CacheSerializer] = None,
+    ):
+        """
+        :param pool: Redis connection pool
+        :param near_cache: Optional in-process tier consulted before Redis
+        :param invalidation_channel: Pub/sub channel on which writes invalidate the near caches of all processes
+        :param serializer: Serializer of values whose key namespace has none registered; JSON by default
+        """
         self.client: redis.Redis = None
         self.pool = pool
+        self.serializer = serializer or CacheSerializer()
+        self.namespaces: dict[str, CacheSerializer] = {}
+        self.near_cache = near_cache
+        self.invalidation_channel = invalidation_channel
+        self.redis_hits = 0
+        self.redis_misses = 0
+        self._listener: Optional[asyncio.Task] = None
 
     async def connect(self):
         """
         Establish a connection to Redis.
         """
         self.client = redis.Redis(connection_pool=self.pool, decode_responses=True)
+        if self.near_cache is not None:
+            self._listener = asyncio.create_task(self._listen_invalidations())
 
     async def disconnect(self):
         """
         Close the Redis connection.
         """
+        if self._listener is not None:
+            self._listener.cancel()
+            await asyncio.gather(self._listener, return_exceptions=True)
+            self._listener = None
 
         if self.client:
             await self.client.close()
 
+    async def _listen_invalidations(self):
+        """
+        Drops near-cached keys written by other processes. Messages published while
+        unsubscribed are lost, so the near cache is cleared whenever the subscription starts.
+        """
+        while True:
+            pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.invalidation_channel)
+                self.near_cache.clear()
+                async for message in pubsub.listen():
+                    key = message['data']
+                    key = key.decode('utf-8') if isinstance(key, bytes) else key
+                    if key == self.CLEAR_ALL:
+                        self.near_cache.clear()
+                    else:
+                        self.near_cache.invalidate(key)
+            except redis.RedisError as e:
+                logger.error(f"Error listening to cache invalidations: {e}")
+                self.near_cache.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.aclose()
+
+    def register_namespace(self, namespace: str, serializer: CacheSerializer):
+        """
+        Stores the values of keys starting with `{namespace}:` with their own serializer,
+        e.g. `cache.register_namespace('repo', CacheSerializer('pickle', compression='zstd'))`.
+        """
+        self.namespaces[namespace] = serializer
+
+    def serializer_for(self, key: str) -> CacheSerializer:
+        return self.namespaces.get(key.partition(':')[0], self.serializer)
+
+    def _encode(self, key: str, value) -> Optional[bytes]:
+        """
+        :return: The value as stored in Redis, or None for a None value, which is not stored
+        """
+        if value is None:
+            return None
+        return self.serializer_for(key).dumps(value)
+
+    def _decode(self, key: str, value: Optional[bytes]):
+        # Only the namespace's own codec is accepted, so a forged pickle header is refused outside pickle namespaces
+        return self.serializer_for(key).loads(value)
+
+    @staticmethod
+    def _expire_seconds(expire: Union[int, timedelta]) -> int:
+        return expire if isinstance(expire, int) else int(expire.total_seconds() // 1)
+
+    async def _write(self, key: str, command: str, *args, **kwargs):
+        """
+        Runs a command changing `key` and, with a near cache, invalidates the key in all
+        processes in the same round trip.
+        """
+        if self.near_cache is None:
+            return await getattr(self.client, command)(*args, **kwargs)
+
+        self.near_cache.invalidate(key)
+        async with self.client.pipeline(transaction=False) as pipe:
+            getattr(pipe, command)(*args, **kwargs)
+            pipe.publish(self.invalidation_channel, key)
+            result, _ = await pipe.execute()
+        return result
+
+    async def _get(self, key: str, near_ttl: Optional[float] = None) -> Optional[bytes]:
+        if self.near_cache is not None and near_ttl != 0:
+            if (value := self.near_cache.get(key)) is not None:
+                return value
+            token = self.near_cache.fill_token(key)
+            value = await self.client.get(name=key)
+            self.near_cache.fill(key, token, value, ttl=near_ttl)
+        else:
+            value = await self.client.get(name=key)
+
+        if value is None:
+            self.redis_misses += 1
+        else:
+            self.redis_hits += 1
+        return value
+
+    async def _get_many(self, keys: Iterable[str], near_ttl: Optional[float] = None) -> dict[str, Optional[bytes]]:
+        keys = list(dict.fromkeys(keys))
+        values, missing, tokens = {}, keys, {}
+        if self.near_cache is not None and near_ttl != 0:
+            missing = []
+            for key in keys:
+                if (value := self.near_cache.get(key)) is not None:
+                    values[key] = value
+                else:
+                    missing.append(key)
+                    tokens[key] = self.near_cache.fill_token(key)
+
+        if missing:
+            for key, value in zip(missing, await self.client.mget(missing)):
+                values[key] = value
+                if key in tokens:
+                    self.near_cache.fill(key, tokens[key], value, ttl=near_ttl)
+                if value is None:
+                    self.redis_misses += 1
+                else:
+                    self.redis_hits += 1
+        return {key: values[key] for key in keys}
+
+    def stats(self) -> dict:
+        """
+        :return: Hit counts and ratios of the near cache and of Redis, for the reads that reached it
+        """
+        lookups = self.redis_hits + self.redis_misses
+        return {
+            'near': self.near_cache.stats() if self.near_cache is not None else None,
+            'redis': {
+                'hits': self.redis_hits,
+                'misses': self.redis_misses,
+                'hit_ratio': self.redis_hits / lookups if lookups else None,
+            },
+        }
+
     async def clear(self):
         """
         Dangerous method to clear all cached data.
         :return:
         """
 
-        await self.client.flushall()
+        await self._write(self.CLEAR_ALL, 'flushall')
+        if self.near_cache is not None:
+            self.near_cache.clear()
 
     async def set(self, key: str, value: Union[str, Dict], expire: Union[int, timedelta] = timedelta(hours=1)) -> bool:
         """
         Store a key-value pair in Redis.
 
         :param key: The key name
-        :param value: The value to store (str or dict)
+        :param value: The value to store, encoded by the serializer of the key's namespace
         :param expire: Expiration time in seconds, default is 1 hour
         :return: True if successfully stored, otherwise False
         """
         try:
+            value = self._encode(key, value)
+            if value is None:
+                return True
 
-            if isinstance(value, bool):
-                value = self.ENCODE_BOOL_TYPES[value]
-            elif isinstance(value, str):
-                value = value
-            else:
-                if value is None:
-                    return True
-                value = json.dumps(value)
-
-            expire = expire if isinstance(expire, int) else int(expire.total_seconds() // 1)
-
-            await self.client.set(name=key, value=value, ex=expire)
+            await self._write(key, 'set', name=key, value=value, ex=self._expire_seconds(expire))
             return True
 
         except redis.RedisError as e:
             logger.error(f"Error setting value in Redis: {e}")
             return False
 
-    async def get(self, key: str) -> Optional[Union[str, Dict]]:
+    async def get(self, key: str, near_ttl: Optional[float] = None) -> Optional[Union[str, Dict]]:
         """
-        Retrieve a value from Redis.
+        Retrieve a value from the near cache or Redis.
 
         :param key: The key name
+        :param near_ttl: Seconds to keep the value in the near cache; 0 always reads Redis, None uses the default
         :return: The value corresponding to the key (str or dict) or None if not found
         """
         try:
-            value = await self.client.get(name=key)
+            return self._decode(key, await self._get(key, near_ttl))
+        except redis.RedisError as e:
+            logger.error(f"Error retrieving value in Redis: {e}")
+            return None
+        except ValueError as e:
+            logger.error(f"Error decoding value of {key}: {e}")
+            return None
+
+    async def get_many(self, keys: Iterable[str], near_ttl: Optional[float] = None) -> dict[str, Optional[Union[str, Dict]]]:
+        """
+        Retrieve several values in one round trip (MGET), for the keys missing from the near cache.
 
-            if isinstance(value, bytes):
-                value = value.decode('utf-8')
+        :param keys: The key names
+        :param near_ttl: Seconds to keep the values in the near cache; 0 always reads Redis, None uses the default
+        :return: The values by key, in the order of `keys`, with None for the keys not found
+        """
+        try:
+            values = await self._get_many(keys, near_ttl)
+        except redis.RedisError as e:
+            logger.error(f"Error retrieving values in Redis: {e}")
+            return dict.fromkeys(keys)
 
-            if value is not None:
-                if value in self.DECODE_BOOL_TYPES:
-                    return self.DECODE_BOOL_TYPES[value]
-                try:
-                    return json.loads(value)  # Convert to dict if value is JSON
-                except json.JSONDecodeError:
-                    return value  # Return as string if not JSON
-            return None
+        result = {}
+        for key, value in values.items():
+            try:
+                result[key] = self._decode(key, value)
+            except ValueError as e:
+                logger.error(f"Error decoding value of {key}: {e}")
+                result[key] = None
+        return result
+
+    async def get_raw(self, key: str, near_ttl: Optional[float] = None) -> Optional[bytes]:
+        """
+        Retrieve a value from the near cache or Redis as stored, without decoding.
+
+        :param key: The key name
+        :param near_ttl: Seconds to keep the value in the near cache; 0 always reads Redis, None uses the default
+        :return: The stored bytes or None if not found
+        """
+        try:
+            return await self._get(key, near_ttl)
         except redis.RedisError as e:
             logger.error(f"Error retrieving value in Redis: {e}")
             return None
 
+    async def set_raw(self, key: str, value: bytes, expire: Union[int, timedelta] = timedelta(hours=1)) -> bool:
+        """
+        Store already serialized bytes in Redis.
+
+        :param key: The key name
+        :param value: The bytes to store
+        :param expire: Expiration time in seconds, default is 1 hour
+        :return: True if successfully stored, otherwise False
+        """
+        try:
+            await self._write(key, 'set', name=key, value=value, ex=self._expire_seconds(expire))
+            return True
+        except redis.RedisError as e:
+            logger.error(f"Error setting value in Redis: {e}")
+            return False
+
+    async def set_many(
+            self,
+            mapping: Dict[str, Any],
+            expire: Union[int, timedelta] = timedelta(hours=1),
+            expires: Optional[Dict[str, Union[int, timedelta]]] = None,
+    ) -> bool:
+        """
+        Store several key-value pairs in one round trip; None values are skipped like in `set`.
+
+        :param mapping: The values to store by key
+        :param expire: Expiration time in seconds of every key, default is 1 hour
+        :param expires: Expiration times of particular keys, overriding `expire`
+        :return: True if all were successfully stored, otherwise False
+        """
+        expires = expires or {}
+        async with self.pipeline() as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, expire=expires.get(key, expire))
+        return all(pipe.results)
+
     async def delete(self, key: str) -> bool:
         """
         Delete a key-value pair from Redis.
@@ -113,20 +314,179 @@ class AsyncRedisCache:
         :return: True if successfully deleted, otherwise False
         """
         try:
-            result = await self.client.delete(key)
+            result = await self._write(key, 'delete', key)
             return result > 0  # Redis returns the number of keys deleted
         except redis.RedisError as e:
             print(f"Error deleting key from Redis: {e}")
             return False
 
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """
+        Delete several keys in one round trip.
+
+        :param keys: The key names
+        :return: The number of keys deleted
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return 0
+
+        try:
+            if self.near_cache is None:
+                return await self.client.delete(*keys)
+
+            async with self.client.pipeline(transaction=False) as pipe:
+                pipe.delete(*keys)
+                for key in keys:
+                    self.near_cache.invalidate(key)
+                    pipe.publish(self.invalidation_channel, key)
+                deleted, *_ = await pipe.execute()
+            return deleted
+        except redis.RedisError as e:
+            logger.error(f"Error deleting keys from Redis: {e}")
+            return 0
+
+    @asynccontextmanager
+    async def pipeline(self):
+        """
+        Batches commands into one round trip, sent when the block exits::
+
+            async with cache.pipeline() as pipe:
+                pipe.set('a', {'x': 1})
+                pipe.get('b')
+            a_stored, b = pipe.results
+        """
+        pipe = CachePipeline(self)
+        yield pipe
+        await pipe.execute()
+
     async def incr(self, key: str, value) -> int:
-        return await self.client.incr(key, value)
+        return await self._write(key, 'incr', key, value)
 
     async def lpush(self, name, value):
         return await self.client.lpush(name, value)
 
     async def expire(self, key: str, ex: int) -> int:
-        return await self.client.expire(key, ex)
+        return await self._write(key, 'expire', key, ex)
 
 
-cache = AsyncRedisCache(pool=redis_pool)
+class CachePipeline:
+    """
+    Commands of an `AsyncRedisCache` queued for one round trip. Values are encoded and
+    decoded as by the cache's own methods, writes invalidate near caches, and each
+    command's result (or its usual failure value: None for reads, False for writes)
+    ends up in `results`, in order.
+    """
+
+    def __init__(self, cache: AsyncRedisCache):
+        self.cache = cache
+        self._pipe = cache.client.pipeline(transaction=False)
+        # Per queued command: how many pipeline replies it takes, how to turn them into its result, and its failure value
+        self._steps: list[tuple[int, Callable, Any]] = []
+        self.results: Optional[list] = None
+
+    def __len__(self):
+        return len(self._steps)
+
+    def _queue(self, command: str, *args, transform: Callable = None, failed=None, **kwargs):
+        getattr(self._pipe, command)(*args, **kwargs)
+        self._steps.append((1, transform or (lambda replies: replies[0]), failed))
+        return self
+
+    def _queue_write(self, key: str, command: str, *args, transform: Callable = None, failed=False, **kwargs):
+        getattr(self._pipe, command)(*args, **kwargs)
+        replies = 1
+        if self.cache.near_cache is not None:
+            self.cache.near_cache.invalidate(key)
+            self._pipe.publish(self.cache.invalidation_channel, key)
+            replies = 2
+        self._steps.append((replies, transform or (lambda replies: replies[0]), failed))
+        return self
+
+    def get(self, key: str):
+        return self._queue('get', key, transform=lambda replies: self.cache._decode(key, replies[0]))
+
+    def get_raw(self, key: str):
+        return self._queue('get', key)
+
+    def set(self, key: str, value, expire: Union[int, timedelta] = timedelta(hours=1)):
+        value = self.cache._encode(key, value)
+        if value is None:
+            self._steps.append((0, lambda replies: True, True))
+            return self
+        return self.set_raw(key, value, expire=expire)
+
+    def set_raw(self, key: str, value: bytes, expire: Union[int, timedelta] = timedelta(hours=1)):
+        return self._queue_write(
+            key, 'set', name=key, value=value, ex=self.cache._expire_seconds(expire), transform=lambda replies: True,
+        )
+
+    def delete(self, key: str):
+        return self._queue_write(key, 'delete', key, transform=lambda replies: replies[0] > 0)
+
+    def incr(self, key: str, value):
+        return self._queue_write(key, 'incr', key, value, failed=None)
+
+    def lpush(self, name, value):
+        return self._queue('lpush', name, value)
+
+    def expire(self, key: str, ex: int):
+        return self._queue_write(key, 'expire', key, ex)
+
+    def command(self, name: str, *args, invalidates: Optional[str] = None, **kwargs):
+        """
+        Queues any other Redis command as is, without encoding or decoding.
+
+        :param name: Name of the redis-py method, e.g. 'hset'
+        :param invalidates: Key the command changes, to invalidate in near caches
+        """
+        if invalidates is not None:
+            return self._queue_write(invalidates, name, *args, failed=None, **kwargs)
+        return self._queue(name, *args, **kwargs)
+
+    async def execute(self) -> list:
+        """
+        Sends the queued commands and sets `results`; runs on leaving `AsyncRedisCache.pipeline()`.
+        """
+        try:
+            replies = await self._pipe.execute(raise_on_error=False) if len(self._pipe) else []
+        except redis.RedisError as e:
+            logger.error(f"Error executing pipeline in Redis: {e}")
+            self.results = [failed for _, _, failed in self._steps]
+            return self.results
+        finally:
+            await self._pipe.reset()
+
+        self.results = []
+        position = 0
+        for count, transform, failed in self._steps:
+            step_replies = replies[position:position + count]
+            position += count
+            error = next((reply for reply in step_replies if isinstance(reply, Exception)), None)
+            if error is not None:
+                logger.error(f"Error executing pipelined command in Redis: {error}")
+                self.results.append(failed)
+                continue
+            try:
+                self.results.append(transform(step_replies))
+            except ValueError as e:
+                # Like `get`: a value this namespace cannot decode reads as missing, and the other steps still count
+                logger.error(f"Error decoding pipelined value: {e}")
+                self.results.append(failed)
+        return self.results
+
+
+cache = AsyncRedisCache(
+    pool=redis_pool,
+    near_cache=NearCache(
+        max_entries=REDIS_SETTINGS.REDIS_NEAR_CACHE_ENTRIES,
+        max_bytes=REDIS_SETTINGS.REDIS_NEAR_CACHE_MAX_BYTES,
+        ttl=REDIS_SETTINGS.REDIS_NEAR_CACHE_TTL,
+    ) if REDIS_SETTINGS.REDIS_NEAR_CACHE_ENTRIES else None,
+    invalidation_channel=REDIS_SETTINGS.REDIS_INVALIDATION_CHANNEL,
+    serializer=CacheSerializer(
+        codec=REDIS_SETTINGS.REDIS_CODEC,
+        compression=REDIS_SETTINGS.REDIS_COMPRESSION,
+        threshold=REDIS_SETTINGS.REDIS_COMPRESSION_THRESHOLD,
+    ),
+)
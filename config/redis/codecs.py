@@ -0,0 +1,198 @@
+__all__ = (
+    'Codec',
+    'Compressor',
+    'CacheSerializer',
+    'CODECS',
+    'COMPRESSORS',
+)
+
+import json
+import pickle
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Optional
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+# Values start with a header byte below 0x20: bits 0-2 are the codec id, bits 3-4 the compressor id.
+# Values stored before codecs existed (text, JSON, counters) start with a printable character instead.
+HEADER_LIMIT = 0x20
+CODEC_MASK = 0b111
+COMPRESSOR_SHIFT = 3
+
+LEGACY_BOOLS = {
+    'true': True,
+    'false': False,
+}
+
+
+@dataclass(frozen=True, slots=True)
+class Codec:
+    id: int
+    name: str
+    dumps: Callable[[Any], bytes]
+    loads: Callable[[bytes], Any]
+    available: bool = True
+
+
+@dataclass(frozen=True, slots=True)
+class Compressor:
+    id: int
+    name: str
+    compress: Callable[[bytes, Optional[int]], bytes]
+    decompress: Callable[[bytes], bytes]
+    available: bool = True
+
+
+def _json_dumps(value) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(value, separators=(',', ':')).encode()
+
+
+def _json_loads(data: bytes):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def _zstd_compress(data: bytes, level: Optional[int]) -> bytes:
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def _zstd_decompress(data: bytes) -> bytes:
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+TEXT = Codec(0, 'text', lambda value: value.encode('utf-8'), lambda data: data.decode('utf-8'))
+BYTES = Codec(1, 'bytes', bytes, bytes)
+# orjson and json write the same format, so processes with and without orjson read each other's values
+JSON = Codec(2, 'json', _json_dumps, _json_loads)
+MSGPACK = Codec(
+    3,
+    'msgpack',
+    lambda value: msgpack.packb(value, use_bin_type=True),
+    lambda data: msgpack.unpackb(data, raw=False, strict_map_key=False),
+    available=msgpack is not None,
+)
+PICKLE = Codec(4, 'pickle', lambda value: pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), pickle.loads)
+
+NONE = Compressor(0, 'none', lambda data, level: data, lambda data: data)
+ZLIB = Compressor(1, 'zlib', lambda data, level: zlib.compress(data, 6 if level is None else level), zlib.decompress)
+ZSTD = Compressor(2, 'zstd', _zstd_compress, _zstd_decompress, available=zstandard is not None)
+LZ4 = Compressor(
+    3,
+    'lz4',
+    lambda data, level: lz4.frame.compress(data, compression_level=level or 0),
+    lambda data: lz4.frame.decompress(data),
+    available=lz4 is not None,
+)
+
+CODECS = {codec.name: codec for codec in (TEXT, BYTES, JSON, MSGPACK, PICKLE)}
+COMPRESSORS = {compressor.name: compressor for compressor in (NONE, ZLIB, ZSTD, LZ4)}
+_CODECS_BY_ID = {codec.id: codec for codec in CODECS.values()}
+_COMPRESSORS_BY_ID = {compressor.id: compressor for compressor in COMPRESSORS.values()}
+
+
+class CacheSerializer:
+    """
+    Turns cached values into bytes prefixed with a header byte naming their codec and
+    compression, so reading a value never has to guess its type. Strings and bytes are
+    stored as such, everything else with the serializer's codec. Payloads of at least
+    `threshold` bytes are compressed when that makes them smaller. Integers are stored as
+    plain decimal text, which Redis counters require and `loads_legacy` reads back.
+    """
+
+    def __init__(
+            self,
+            codec: str = 'json',
+            compression: Optional[str] = None,
+            threshold: int = 1024,
+            level: Optional[int] = None,
+    ):
+        """
+        :param codec: Codec of values other than strings and bytes: 'json', 'msgpack' or 'pickle'
+        :param compression: 'zlib', 'zstd', 'lz4' or None
+        :param threshold: Minimum payload size in bytes to compress
+        :param level: Compression level; None uses the compressor's default
+        """
+        if codec not in CODECS or codec in ('text', 'bytes'):
+            raise ValueError(f"Unsupported codec: {codec}")
+        if compression is not None and compression not in COMPRESSORS:
+            raise ValueError(f"Unsupported compression: {compression}")
+
+        self.codec = CODECS[codec]
+        self.compressor = COMPRESSORS[compression or 'none']
+        for part in (self.codec, self.compressor):
+            if not part.available:
+                raise ValueError(f"'{part.name}' requires a package that is not installed")
+        self.threshold = threshold
+        self.level = level
+
+    def dumps(self, value) -> bytes:
+        if isinstance(value, int) and not isinstance(value, bool):
+            # Integers stay headerless decimal text, so counters written with SET still work with INCR/INCRBY
+            return str(value).encode()
+        if isinstance(value, str):
+            codec = TEXT
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            codec = BYTES
+        else:
+            codec = self.codec
+
+        payload = codec.dumps(value)
+        compressor = NONE
+        if self.compressor is not NONE and len(payload) >= self.threshold:
+            compressed = self.compressor.compress(payload, self.level)
+            if len(compressed) < len(payload):
+                payload, compressor = compressed, self.compressor
+
+        return bytes((codec.id | compressor.id << COMPRESSOR_SHIFT,)) + payload
+
+    def loads(self, data: Optional[bytes]):
+        """
+        Decodes a value written with this serializer's codec (with any compression), a string or
+        bytes, or a value written before codecs existed. Headers naming another codec are refused,
+        so a value that was not written as pickle is never unpickled.
+        """
+        if data is None:
+            return None
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        if not data or data[0] >= HEADER_LIMIT:
+            return CacheSerializer.loads_legacy(data)
+
+        codec = _CODECS_BY_ID.get(data[0] & CODEC_MASK)
+        compressor = _COMPRESSORS_BY_ID.get(data[0] >> COMPRESSOR_SHIFT)
+        if codec not in (self.codec, TEXT, BYTES) or compressor is None or not compressor.available:
+            raise ValueError(f"Cannot decode cached value with header {data[0]:#04x} as {self.codec.name}")
+        return codec.loads(compressor.decompress(data[1:]))
+
+    @staticmethod
+    def loads_legacy(data: bytes):
+        """
+        Decodes headerless values: the former text/JSON format, and counters written by INCR.
+        """
+        value = data.decode('utf-8')
+        if value in LEGACY_BOOLS:
+            return LEGACY_BOOLS[value]
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
@@ -0,0 +1,241 @@
+__all__ = (
+    'cached',
+)
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import math
+import random
+import secrets
+import time
+from datetime import timedelta
+from typing import Callable, Optional, Union
+
+import redis.asyncio as redis
+
+from .cache import cache
+from .codecs import CacheSerializer
+from ..settings import REDIS_SETTINGS
+
+logger = logging.getLogger(__name__)
+
+NAMESPACE = 'cached'
+
+# Deletes the lock only while it still holds this caller's token, so an expired lock taken over by another worker survives
+_RELEASE_LOCK = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+# Results are arbitrary objects (models, schemas, ORM instances), so they are pickled like repository results
+cache.register_namespace(NAMESPACE, CacheSerializer(
+    'pickle',
+    compression=REDIS_SETTINGS.REDIS_COMPRESSION,
+    threshold=REDIS_SETTINGS.REDIS_COMPRESSION_THRESHOLD,
+))
+
+# Computations running in this process by cache key, shared by concurrent callers
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def _seconds(value: Union[int, float, timedelta]) -> float:
+    return value.total_seconds() if isinstance(value, timedelta) else value
+
+
+def cached(
+        ttl: Union[int, float, timedelta],
+        key: Union[str, Callable[..., str], None] = None,
+        stale_ttl: Union[int, float, timedelta] = 0,
+        beta: float = 1.0,
+        lock_timeout: Union[int, float, timedelta] = 10,
+):
+    """
+    Caches the results of an async function or `BaseService` method in Redis::
+
+        class ProductService(BaseService):
+            @cached(ttl=60, key='product:{product_id}', stale_ttl=300)
+            async def get_product(self, product_id: int): ...
+
+    Stampedes on a hot key are avoided in three ways. Concurrent callers in one process
+    share a single computation. Across processes a short Redis lock lets one caller
+    recompute while the others serve the previous value for up to `stale_ttl` after it
+    expired, or wait for the new one when there is none. Callers also refresh a value
+    early with a probability rising as it nears expiry, scaled by how long it took to
+    compute ("XFetch"), so hot keys are usually recomputed before they expire at all.
+    Refreshes of functions run in the background: the caller triggering one gets the
+    current value. Refreshes of methods run before the caller returns, since the instance
+    (e.g. a service and its request's `self.db` session) does not outlive the request.
+
+    Methods need an explicit `key`: the default one leaves out `self`, which for services
+    holds the user, so it would share one user's results with every other.
+
+    :param ttl: Seconds a result is fresh
+    :param key: Format string of the function's arguments (e.g. 'user:{self.payload.id}'), or a function
+        taking the same arguments; by default the function's name and a hash of its arguments (`cls` excepted)
+    :param stale_ttl: Seconds an expired result is still served while one caller recomputes it
+    :param beta: Eagerness of early refresh; 0 disables it
+    :param lock_timeout: Seconds the recompute lock is held at most, and other callers wait for a missing result
+    """
+    ttl, stale_ttl, lock_timeout = _seconds(ttl), _seconds(stale_ttl), _seconds(lock_timeout)
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        parameters = list(signature.parameters)
+        if key is None and parameters and parameters[0] == 'self':
+            raise ValueError(
+                f"'key' must be given to cache the method {func.__qualname__}, e.g. including '{{self.payload.id}}' "
+                f"for per-user results, as the default key does not depend on the instance"
+            )
+        skip_first = bool(parameters) and parameters[0] == 'cls'
+        is_method = bool(parameters) and parameters[0] == 'self'
+
+        def key_for(*args, **kwargs) -> str:
+            if callable(key):
+                return f'{NAMESPACE}:{key(*args, **kwargs)}'
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            if key is not None:
+                return f'{NAMESPACE}:{key.format(**bound.arguments)}'
+
+            arguments = dict(bound.arguments)
+            if skip_first:
+                arguments.pop(parameters[0])
+            digest = hashlib.sha1(json.dumps(arguments, sort_keys=True, default=str).encode()).hexdigest()
+            return f'{NAMESPACE}:{func.__module__}.{func.__qualname__}:{digest}'
+
+        async def compute(cache_key: str, args, kwargs):
+            start = time.time()
+            value = await func(*args, **kwargs)
+            delta = time.time() - start
+            await cache.set(cache_key, (value, time.time() + ttl, delta), expire=math.ceil(ttl + stale_ttl))
+            return value
+
+        async def load_missing(cache_key: str, args, kwargs):
+            """
+            Computes a result that is not cached, or waits for the worker holding the lock to store it.
+            """
+            token = await _acquire(cache_key, lock_timeout)
+            if token is not None:
+                try:
+                    return await compute(cache_key, args, kwargs)
+                finally:
+                    await _release(cache_key, token)
+
+            deadline = time.monotonic() + lock_timeout
+            while time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+                if (entry := await cache.get(cache_key, near_ttl=0)) is not None:
+                    return entry[0]
+                # The lock expired or was released without a result (the holder failed): take over
+                if (token := await _acquire(cache_key, lock_timeout)) is not None:
+                    try:
+                        return await compute(cache_key, args, kwargs)
+                    finally:
+                        await _release(cache_key, token)
+            # The lock holder is slow: compute rather than fail
+            return await compute(cache_key, args, kwargs)
+
+        async def refresh(cache_key: str, args, kwargs, current=None):
+            """
+            Recomputes an expiring or stale result, if no other worker does.
+            :return: The new result, or `current` when another worker refreshes it or the refresh failed
+            """
+            token = await _acquire(cache_key, lock_timeout)
+            if token is None:
+                return current
+            try:
+                return await compute(cache_key, args, kwargs)
+            except Exception as e:
+                logger.error(f"Error refreshing {cache_key}, serving the previous value: {e}")
+                return current
+            finally:
+                await _release(cache_key, token)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if cache.client is None:
+                return await func(*args, **kwargs)
+
+            cache_key = key_for(*args, **kwargs)
+            entry = await cache.get(cache_key)
+            if entry is None:
+                return await _singleflight(cache_key, load_missing(cache_key, args, kwargs))
+
+            value, expires_at, delta = entry
+            # XFetch: -log(random()) is exponentially distributed, so refreshes cluster just before expiry
+            refresh_at = expires_at + delta * beta * math.log(random.random() or 1e-12)
+            if time.time() >= refresh_at:
+                if is_method:
+                    # A background task would run after the response, when the request's session is closed
+                    return await refresh(cache_key, args, kwargs, value)
+                # Tracked apart from loads of the missing key, which must not wait for a refresh returning nothing
+                _start(f'refresh:{cache_key}', refresh(cache_key, args, kwargs))
+            return value
+
+        async def invalidate(*args, **kwargs) -> bool:
+            """
+            Drops the cached result for these arguments.
+            """
+            return await cache.delete(key_for(*args, **kwargs))
+
+        wrapper.key_for = key_for
+        wrapper.invalidate = invalidate
+        return wrapper
+
+    return decorator
+
+
+def _start(cache_key: str, coroutine) -> asyncio.Task:
+    """
+    Runs `coroutine` as a task of its own, unless a computation of the key is already running in this process.
+    :return: The computation of the key
+    """
+    if (task := _inflight.get(cache_key)) is None:
+        task = _inflight[cache_key] = asyncio.ensure_future(coroutine)
+        task.add_done_callback(functools.partial(_finished, cache_key))
+    else:
+        coroutine.close()
+    return task
+
+
+async def _singleflight(cache_key: str, coroutine):
+    """
+    Runs `coroutine` unless a computation of the key is already running in this process, whose result is shared instead.
+    The computation is a task of its own, so a caller that is cancelled does not cancel it for the others.
+    """
+    return await asyncio.shield(_start(cache_key, coroutine))
+
+
+def _finished(cache_key: str, task: asyncio.Task):
+    _inflight.pop(cache_key, None)
+    if not task.cancelled():
+        # Retrieved here, so a failure whose callers were all cancelled is not reported as never retrieved
+        task.exception()
+
+
+async def _acquire(cache_key: str, timeout: float) -> Optional[str]:
+    """
+    :return: Token of the acquired recompute lock, or None if another caller holds it
+    """
+    token = secrets.token_hex(8)
+    try:
+        acquired = await cache.client.set(f'lock:{cache_key}', token, nx=True, px=int(timeout * 1000))
+    except redis.RedisError as e:
+        # Without Redis there is nothing to coordinate with: recompute
+        logger.error(f"Error acquiring lock for {cache_key}: {e}")
+        return token
+    return token if acquired else None
+
+
+async def _release(cache_key: str, token: str):
+    try:
+        await cache.client.eval(_RELEASE_LOCK, 1, f'lock:{cache_key}', token)
+    except redis.RedisError as e:
+        logger.error(f"Error releasing lock for {cache_key}: {e}")
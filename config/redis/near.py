@@ -0,0 +1,105 @@
+__all__ = (
+    'NearCache',
+)
+
+import time
+from collections import OrderedDict
+from typing import Optional
+
+
+class NearCache:
+    """
+    In-process LRU of raw Redis values, bounded by entry count and total bytes, with a
+    per-entry TTL. It only keeps what was read from Redis; writes invalidate the key
+    here and, through `AsyncRedisCache`, in every other process.
+
+    A read that misses takes a fill token first and stores its result with it, so a value
+    read before an invalidation of the same key arrived is not cached afterwards.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 16 * 1024 * 1024, ttl: float = 5.0):
+        """
+        :param max_entries: Maximum number of cached keys
+        :param max_bytes: Maximum total size of cached values
+        :param ttl: Default seconds a value is served locally before it is read from Redis again
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._filling: dict[str, object] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def fill_token(self, key: str) -> object:
+        """
+        :return: Token to pass to `fill` with the value read for `key` from Redis
+        """
+        token = self._filling[key] = object()
+        return token
+
+    def fill(self, key: str, token: object, value: Optional[bytes], ttl: Optional[float] = None):
+        """
+        Caches a value read from Redis, unless the key was invalidated since `token` was taken.
+        """
+        if self._filling.get(key) is not token:
+            return
+        del self._filling[key]
+
+        ttl = self.ttl if ttl is None else ttl
+        if value is None or ttl <= 0 or len(value) > self.max_bytes:
+            return
+
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self.bytes += len(value)
+        while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= len(evicted)
+            self.evictions += 1
+
+    def invalidate(self, key: str):
+        self._filling.pop(key, None)
+        self._remove(key)
+
+    def clear(self):
+        self._filling.clear()
+        self._entries.clear()
+        self.bytes = 0
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.bytes -= len(entry[1])
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else None,
+            'entries': len(self._entries),
+            'bytes': self.bytes,
+            'evictions': self.evictions,
+        }
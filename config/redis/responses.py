@@ -0,0 +1,153 @@
+__all__ = (
+    'ResponseCachePolicy',
+    'cache_response',
+    'invalidate_responses',
+)
+
+import hashlib
+import struct
+from dataclasses import dataclass
+from typing import Iterable, Optional
+from urllib.parse import parse_qsl, urlencode
+
+from .cache import cache
+from .codecs import CacheSerializer
+from ..settings import REDIS_SETTINGS
+
+NAMESPACE = 'http'
+
+# Stored responses are packed into bytes by `pack_response`, so reading one never unpickles anything
+cache.register_namespace(NAMESPACE, CacheSerializer(
+    'json',
+    compression=REDIS_SETTINGS.REDIS_COMPRESSION,
+    threshold=REDIS_SETTINGS.REDIS_COMPRESSION_THRESHOLD,
+))
+
+# Status, ETag length and header count; then the name and value lengths of each header
+_RESPONSE_HEAD = struct.Struct('>HHH')
+_HEADER_SIZES = struct.Struct('>HI')
+
+
+@dataclass(frozen=True, slots=True)
+class ResponseCachePolicy:
+    ttl: int
+    max_age: int
+    vary: tuple[str, ...]
+    private: bool
+    tags: tuple[str, ...]
+
+    @property
+    def cache_control(self) -> str:
+        if self.max_age:
+            return f"{'private' if self.private else 'public'}, max-age={self.max_age}"
+        # Clients keep the response but revalidate it with its ETag every time
+        return f"{'private' if self.private else 'public'}, no-cache"
+
+
+def cache_response(
+        ttl: int = 60,
+        max_age: int = 0,
+        vary: Iterable[str] = (),
+        private: bool = False,
+        tags: Iterable[str] = (),
+):
+    """
+    Caches a GET route's successful responses in Redis, served by `ResponseCacheMiddleware`
+    with a strong ETag, so an unchanged response costs clients a 304::
+
+        @router.get('/products')
+        @cache_response(ttl=300, tags=('products',))
+        async def products(): ...
+
+    Warning: cache hits and 304s are answered without running the route, so its dependencies
+    and any permission checks do not run for them. Only cache responses every client that
+    can reach the route may see: `private=True` keys them by user (the token is verified,
+    not its permissions), and routes with security dependencies are refused shared caching.
+
+    :param ttl: Seconds a response is kept in Redis
+    :param max_age: Seconds clients may reuse the response without asking; 0 makes them revalidate
+    :param vary: Request headers the response depends on, part of the cache key
+    :param private: Whether the response depends on the user: the token's `Payload.id` is part
+        of the key, shared caches may not keep it, and requests without a valid token are not cached
+    :param tags: Names for `invalidate_responses`; the route's path is always one of them
+    """
+    policy = ResponseCachePolicy(
+        ttl=ttl,
+        max_age=max_age,
+        vary=tuple(header.lower() for header in vary),
+        private=private,
+        tags=tuple(tags),
+    )
+
+    def decorator(endpoint):
+        endpoint.__response_cache__ = policy
+        return endpoint
+
+    return decorator
+
+
+def pack_response(status_code: int, headers: list[tuple[bytes, bytes]], body: bytes, etag: str) -> bytes:
+    """
+    Lays a response out as its fixed-size head, the ETag, each header's sizes, name and
+    value, and the body last, so it is stored without a general-purpose serializer.
+    """
+    etag = etag.encode('latin-1')
+    parts = [_RESPONSE_HEAD.pack(status_code, len(etag), len(headers)), etag]
+    for name, value in headers:
+        parts += (_HEADER_SIZES.pack(len(name), len(value)), bytes(name), bytes(value))
+    parts.append(body)
+    return b''.join(parts)
+
+
+def unpack_response(data: bytes) -> tuple[int, list[tuple[bytes, bytes]], bytes, str]:
+    """
+    :return: The status, headers, body and ETag of a response laid out by `pack_response`
+    :raises ValueError: If `data` is not such a response
+    """
+    try:
+        status_code, etag_size, header_count = _RESPONSE_HEAD.unpack_from(data)
+        offset = _RESPONSE_HEAD.size + etag_size
+        etag = data[_RESPONSE_HEAD.size:offset].decode('latin-1')
+        headers = []
+        for _ in range(header_count):
+            name_size, value_size = _HEADER_SIZES.unpack_from(data, offset)
+            offset += _HEADER_SIZES.size
+            headers.append((data[offset:offset + name_size], data[offset + name_size:offset + name_size + value_size]))
+            offset += name_size + value_size
+    except (struct.error, TypeError) as e:
+        raise ValueError(f"Malformed cached response: {e}") from e
+    if offset > len(data):
+        raise ValueError("Malformed cached response: truncated")
+    return status_code, headers, data[offset:], etag
+
+
+def tag_version_key(tag: str) -> str:
+    return f'{NAMESPACE}:tag:{tag}'
+
+
+async def invalidate_responses(*tags: str):
+    """
+    Drops the cached responses of routes with any of `tags` (or those route paths,
+    e.g. '/api/v1/products/{product_id}'), by bumping their versions; call it from
+    services after writes the responses show.
+    """
+    if cache.client is None:
+        return
+    async with cache.pipeline() as pipe:
+        for tag in tags:
+            pipe.incr(tag_version_key(tag), 1)
+
+
+def response_cache_key(
+        path: str,
+        query_string: bytes,
+        headers: dict[str, str],
+        policy: ResponseCachePolicy,
+        versions: Iterable,
+        user_id: Optional[int] = None,
+) -> str:
+    # Parameter order does not change the response, so it does not change the key either
+    query = urlencode(sorted(parse_qsl(query_string.decode('latin-1'), keep_blank_values=True)))
+    parts = [path, query, *(f'{header}={headers.get(header, "")}' for header in policy.vary), str(user_id)]
+    digest = hashlib.sha1('\n'.join(parts).encode()).hexdigest()
+    return f"{NAMESPACE}:{':'.join(str(version or 0) for version in versions)}:{digest}"
@@ -13,6 +13,7 @@ from starlette.staticfiles import StaticFiles
 from api.routers import __routes__ as api_routes, __ws_routes__ as ws_routes
 from config import APP_SETTINGS
 from .events import on_startup, on_shutdown
+from .middlewares import BatchLoaderMiddleware, RequestDeadlineMiddleware, ResponseCacheMiddleware
 
 
 class Server:
@@ -47,6 +48,8 @@ class Server:
 
     @staticmethod
     def __register_middlewares(app: FastAPI):
+        # Added first, so it runs innermost and cached responses hold no CORS headers
+        app.add_middleware(ResponseCacheMiddleware)
         app.add_middleware(
             CORSMiddleware,
             allow_origins=["*"],
@@ -54,6 +57,8 @@ class Server:
             allow_methods=["*"],
             allow_headers=["*"],
         )
+        app.add_middleware(BatchLoaderMiddleware)
+        app.add_middleware(RequestDeadlineMiddleware)
 
     @staticmethod
     def __register_media_files(app: FastAPI):
@@ -12,10 +12,10 @@ __all__ = (
 import os
 from datetime import timedelta
 from pathlib import Path
-from typing import ClassVar
+from typing import ClassVar, Literal, Optional
 
 from dotenv import load_dotenv
-from pydantic import PostgresDsn, RedisDsn
+from pydantic import PostgresDsn, RedisDsn, model_validator
 from pydantic_settings import BaseSettings
 
 load_dotenv()
@@ -42,18 +42,55 @@ class APPSettings(EnvReader):
     TIME_ZONE: str = 'Asia/Tashkent'
     SERVER_HOST: str = 'localhost'
     DEBUG: bool = True
+    REQUEST_DEADLINE_SECONDS: float = 0
+    MONITORING_ENABLED: bool = False
+    MONITORING_TOKEN: Optional[str] = None
+
+    @model_validator(mode='after')
+    def check_monitoring_token(self):
+        if self.MONITORING_ENABLED and not self.MONITORING_TOKEN:
+            raise ValueError("MONITORING_TOKEN must be set when MONITORING_ENABLED is on")
+        return self
 
 
 class DBSettings(EnvReader):
-    DB_HOST: str
-    DB_PORT: int
-    DB_NAME: str
-    DB_USER: str
-    DB_PASSWORD: str
-    ECHO: bool
+    # Required with PostgreSQL only; DB_BACKEND=sqlite+aiosqlite (e.g. for tests) needs none of them
+    DB_HOST: Optional[str] = None
+    DB_PORT: Optional[int] = None
+    DB_NAME: Optional[str] = None
+    DB_USER: Optional[str] = None
+    DB_PASSWORD: Optional[str] = None
+    ECHO: bool = False
+    DB_REPLICA_URLS: list[str] = []
+    DB_REPLICA_BALANCING: Literal['round_robin', 'least_connections'] = 'round_robin'
+    DB_READ_YOUR_WRITES_SECONDS: float = 0
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30
+    DB_POOL_RECYCLE: int = -1
+    DB_POOL_PRE_PING: bool = False
+    DB_PROFILE: bool = False
+    DB_SLOW_QUERY_MS: float = 200
+    DB_EXPLAIN_SAMPLE_RATE: float = 0
+    DB_ARCHIVE_AFTER_DAYS: int = 30
+    DB_ARCHIVE_BATCH_SIZE: int = 1000
+    DB_MAINTAIN_PARTITIONS_ON_STARTUP: bool = True
+    DB_WORKER_ID: Optional[int] = None
+    DB_BACKEND: Literal['postgresql+asyncpg', 'sqlite+aiosqlite'] = 'postgresql+asyncpg'
+    DB_SQLITE_PATH: str = ':memory:'
+
+    @model_validator(mode='after')
+    def check_postgres_settings(self):
+        if not self.DB_BACKEND.startswith('sqlite'):
+            missing = [name for name in ('DB_HOST', 'DB_PORT', 'DB_NAME', 'DB_USER', 'DB_PASSWORD') if getattr(self, name) is None]
+            if missing:
+                raise ValueError(f"{', '.join(missing)} must be set when DB_BACKEND is {self.DB_BACKEND}")
+        return self
 
     @property
     def URL(self) -> str:
+        if self.DB_BACKEND.startswith('sqlite'):
+            return f'{self.DB_BACKEND}:///{self.DB_SQLITE_PATH}'
         return str(PostgresDsn.build(
             scheme='postgresql+asyncpg',
             host=self.DB_HOST,
@@ -68,6 +105,14 @@ class RedisSettings(EnvReader):
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_DB: int
+    REDIS_NEAR_CACHE_ENTRIES: int = 0
+    REDIS_NEAR_CACHE_MAX_BYTES: int = 16 * 1024 * 1024
+    REDIS_NEAR_CACHE_TTL: float = 5
+    REDIS_INVALIDATION_CHANNEL: str = 'cache:invalidate'
+    REDIS_CODEC: Literal['json', 'msgpack', 'pickle'] = 'json'
+    REDIS_COMPRESSION: Optional[Literal['zlib', 'zstd', 'lz4']] = None
+    REDIS_COMPRESSION_THRESHOLD: int = 1024
+    REDIS_RESPONSE_CACHE_MAX_BYTES: int = 1024 * 1024
 
     @property
     def URL(self) -> str:
@@ -6,6 +6,7 @@ from sqlalchemy import pool
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import async_engine_from_config
 
+from config.db import is_partition_table
 from config.settings import DB_SETTINGS
 from models import * # noqa
 
@@ -19,6 +20,13 @@ target_metadata = Base.metadata
 config.set_main_option("sqlalchemy.url", DB_SETTINGS.URL)
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    # Partitions of `RangeByMonth` tables are managed by `maintain_partitions`, not by migrations
+    if type_ == 'table' and reflected and compare_to is None and is_partition_table(name, target_metadata):
+        return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -37,6 +45,9 @@ def run_migrations_offline() -> None:
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
+        include_object=include_object,
+        # SQLite cannot ALTER most things, so changes are rendered as table rebuilds
+        render_as_batch=url.startswith('sqlite'),
     )
 
     with context.begin_transaction():
@@ -44,7 +55,12 @@ def run_migrations_offline() -> None:
 
 
 def do_run_migrations(connection: Connection) -> None:
-    context.configure(connection=connection, target_metadata=target_metadata)
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        include_object=include_object,
+        render_as_batch=connection.dialect.name == 'sqlite',
+    )
 
     with context.begin_transaction():
         context.run_migrations()
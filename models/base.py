@@ -1,6 +1,7 @@
 __all__ = (
     'BaseModel',
     'Base',
+    'SoftDeleteMixin',
 )
 
 from typing import TypeVar, Optional
@@ -15,15 +16,10 @@ from utils import utcnow
 T = TypeVar("T", bound="Base")
 
 
-class Base(DeclarativeBase, AsyncAttrs, OrmManager):
-    __abstract__ = True
-
-    @declared_attr.directive
-    def __tablename__(cls) -> str:
-        return str(cls.__name__) + 's'
-
-    id: Mapped[int] = mapped_column(
-        sa.BigInteger(),
+def identity_id_column(cache: int = 1):
+    return mapped_column(
+        # SQLite only autoincrements an INTEGER PRIMARY KEY (the rowid)
+        sa.BigInteger().with_variant(sa.Integer(), 'sqlite'),
         primary_key=True,
         autoincrement=True,
         index=True,
@@ -34,16 +30,61 @@ class Base(DeclarativeBase, AsyncAttrs, OrmManager):
             minvalue=1,
             maxvalue=9223372036854775807,
             cycle=False,
-            cache=1,
+            cache=cache,
         ),
     )
 
+
+def generated_id_column(generator):
+    return mapped_column(
+        sa.BigInteger(),
+        primary_key=True,
+        autoincrement=False,
+        index=True,
+        default=generator.next_id,
+    )
+
+
+class Base(DeclarativeBase, AsyncAttrs, OrmManager):
+    __abstract__ = True
+
+    @declared_attr.directive
+    def __tablename__(cls) -> str:
+        return str(cls.__name__) + 's'
+
+    id: Mapped[int] = identity_id_column()
+
+    # Set `__id_generator__` (e.g. `config.db.snowflake`) to assign ids in Python when instances
+    # are created, or `__identity_cache__` to preallocate that many Identity values per session.
+    __id_generator__ = None
+    __identity_cache__ = None
+
     def __init_subclass__(cls, **kwargs):
+        # Id generation and partitioning change the columns and table arguments, so they are set up before mapping
+        if not cls.__dict__.get('__abstract__'):
+            if cls.__id_generator__ is not None:
+                cls.id = generated_id_column(cls.__id_generator__)
+            elif cls.__identity_cache__ is not None:
+                cls.id = identity_id_column(cls.__identity_cache__)
+        if (partition := cls.__dict__.get('__partition__')) is not None:
+            partition.prepare(cls)
+
         super().__init_subclass__(**kwargs)
 
+        if partition is not None:
+            partition.register(cls.__table__)
+
+        if cls.__id_generator__ is not None and not cls.__dict__.get('__abstract__'):
+            sa.event.listen(cls, 'init', cls.__assign_generated_id)
+
         if cls.__name__ not in ("Base", "BaseModel"):
             cls.repo = cls.get_new_repo()()
 
+    @staticmethod
+    def __assign_generated_id(target, args, kwargs):
+        if kwargs.get('id') is None:
+            target.id = type(target).__id_generator__.next_id()
+
     @classmethod
     def get_new_repo(cls):
         class NewRepo(SqlAlchemyRepository):
@@ -61,7 +102,7 @@ class BaseModel(Base):
     created_at: Mapped[Optional[sa.DateTime]] = mapped_column(
         sa.DateTime(timezone=True),
         default=utcnow,
-        nullable=False
+        nullable=False,
     )
     updated_at: Mapped[Optional[sa.DateTime]] = mapped_column(
         sa.DateTime(timezone=True),
@@ -69,3 +110,70 @@ class BaseModel(Base):
         onupdate=utcnow,
         nullable=False,
     )
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Serves the default keyset order (created_at, id) of cursor pages, and lookups by created_at alone
+        if '__table__' in cls.__dict__:
+            table = cls.__table__
+            sa.Index(f'ix_{table.name}_created_at_id', table.c.created_at, table.c.id)
+
+
+class SoftDeleteMixin:
+    """
+    Marks rows as deleted instead of removing them; list it before the base model:
+    `class Product(SoftDeleteMixin, BaseModel)`.
+
+    Repository reads skip deleted rows. Indexes and unique constraints of single
+    columns become partial (`WHERE deleted IS NOT TRUE`), so they only cover live
+    rows and a deleted row's unique values can be reused. Old deleted rows are moved
+    to `{table}_archive` by `config.db.maintenance.archive_soft_deleted`.
+    """
+
+    deleted: Mapped[bool] = mapped_column(sa.Boolean(), default=False, server_default=sa.false(), nullable=False)
+    deleted_at: Mapped[Optional[sa.DateTime]] = mapped_column(sa.DateTime(timezone=True), nullable=True)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+
+        table = cls.__dict__.get('__table__')
+        if table is not None:
+            cls.__make_indexes_partial(table)
+            cls.__archive_table__ = cls.__create_archive_table(table)
+
+    @staticmethod
+    def __make_indexes_partial(table: sa.Table):
+        live = table.c.deleted.is_not(True)
+        for column in table.columns:
+            if column.primary_key or column.key in ('deleted', 'deleted_at') or not (column.index or column.unique):
+                continue
+
+            for index in [index for index in table.indexes if list(index.columns) == [column]]:
+                table.indexes.discard(index)
+            for constraint in [
+                constraint for constraint in table.constraints
+                if isinstance(constraint, sa.UniqueConstraint) and list(constraint.columns) == [column]
+            ]:
+                table.constraints.discard(constraint)
+
+            sa.Index(
+                f'ix_{table.name}_{column.name}',
+                column,
+                unique=bool(column.unique),
+                postgresql_where=live,
+                sqlite_where=live,
+            )
+            column.index = column.unique = None
+
+    @staticmethod
+    def __create_archive_table(table: sa.Table) -> sa.Table:
+        return sa.Table(
+            f'{table.name}_archive',
+            table.metadata,
+            *(
+                sa.Column(column.name, column.type, primary_key=column.primary_key, autoincrement=False)
+                for column in table.columns
+            ),
+            sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+            schema=table.schema,
+        )
@@ -6,9 +6,7 @@ __all__ = (
 from typing import Union, Annotated
 
 from fastapi import Depends, status, HTTPException
-from sqlalchemy.ext.asyncio import AsyncSession
 
-from config.db import get_db
 from utils.jwt import Payload
 from .current_payload import get_token_payload_or_none
 
@@ -16,11 +14,10 @@ User = None
 
 
 async def get_user_or_none(
-        db: Annotated[AsyncSession, Depends(get_db)],
         payload: Annotated[Payload, Depends(get_token_payload_or_none)],
 ) -> Union[User, None]:
     if payload:
-        user = await User.repo.db_first(session=db, id=payload.id)
+        user = await User.repo.load(payload.id)
 
         if user:
             if user.is_active is False:
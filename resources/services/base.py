@@ -7,6 +7,7 @@ from sqlalchemy import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from config.db import get_db, db_helper
+from config.redis import invalidate_responses
 from utils import Payload
 from .decorators import permission
 from ..depends.current_payload import get_token_payload_or_none
@@ -44,10 +45,18 @@ class BaseService:
                 if hasattr(cls, func_name):
                     original_method = getattr(cls, func_name)
 
-                    if not getattr(original_method, "__wrapped__", None):
+                    # Other decorators (e.g. `cached`) also set `__wrapped__`, so only the permission mark counts
+                    if not getattr(original_method, "permission", None):
                         decorated_method = permission(cls.default_permission)(original_method)
                         setattr(cls, func_name, decorated_method)
 
+    @staticmethod
+    async def invalidate_responses(*tags: str):
+        """
+        Drops cached responses of routes with these tags or paths, after a write they show.
+        """
+        await invalidate_responses(*tags)
+
     def error(self, text):
         raise HTTPException(detail=text, status_code=status.HTTP_400_BAD_REQUEST)
 
@@ -23,6 +23,8 @@ def permission(permission_func):
             else:
                 return func(self, *args, **kwargs)
 
+        # Marks the method as checked, so BaseService does not add its default permission on top
+        wrapper.permission = permission_func
         return wrapper
 
     return decorator
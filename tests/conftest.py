@@ -0,0 +1,85 @@
+"""
+Tests run against in-memory SQLite, so they need neither PostgreSQL nor a `.env`;
+the settings below are set before `config` is first imported.
+"""
+import os
+
+os.environ['DB_BACKEND'] = 'sqlite+aiosqlite'
+os.environ['DB_SQLITE_PATH'] = ':memory:'
+for name, value in {
+    'REDIS_HOST': 'localhost',
+    'REDIS_PORT': '6379',
+    'REDIS_DB': '0',
+    'EMAIL_HOST': 'localhost',
+    'EMAIL_PORT': '25',
+    'EMAIL_PASSWORD': 'test',
+    'EMAIL': 'test@example.com',
+    'JWT_SECRET_KEY': 'test-secret-key-of-at-least-32-bytes',
+    'AWS_ACCESS_KEY_ID': 'test',
+    'AWS_SECRET_ACCESS_KEY': 'test',
+    'AWS_BUCKET_NAME': 'test',
+    'AWS_REGION_NAME': 'test',
+}.items():
+    os.environ.setdefault(name, value)
+
+import fakeredis
+import pytest
+import pytest_asyncio
+
+from config.db import DatabaseHelper, SqlAlchemyRepository
+from config.redis import cache
+from models import Base
+
+
+@pytest_asyncio.fixture
+async def db_helper(monkeypatch):
+    """
+    A fresh in-memory SQLite database, used by every repository for the test.
+    """
+    helper = DatabaseHelper('sqlite+aiosqlite://', echo=False)
+    monkeypatch.setattr(SqlAlchemyRepository, 'db_helper', helper)
+    yield helper
+    await helper.engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def schema(db_helper):
+    """
+    Creates the tables of every model imported so far, test modules' own included.
+    """
+    async with db_helper.engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    yield db_helper
+
+
+@pytest_asyncio.fixture(params=['sqlite', 'postgresql'])
+async def concurrent_schema(request, tmp_path, monkeypatch):
+    """
+    Like `schema`, but every session gets its own connection, as concurrent requests do:
+    a SQLite file, and PostgreSQL at TEST_POSTGRES_URL when that is set.
+    """
+    if request.param == 'sqlite':
+        url = f'sqlite+aiosqlite:///{tmp_path / "test.db"}'
+    elif not (url := os.environ.get('TEST_POSTGRES_URL')):
+        pytest.skip('TEST_POSTGRES_URL is not set')
+
+    helper = DatabaseHelper(url, echo=False)
+    monkeypatch.setattr(SqlAlchemyRepository, 'db_helper', helper)
+    async with helper.engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    yield helper
+    async with helper.engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+    await helper.engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def redis_client(monkeypatch):
+    """
+    An in-memory Redis behind `cache`, which returns bytes like the app's connection pool.
+    """
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(cache, 'client', client)
+    yield client
+    await client.aclose()
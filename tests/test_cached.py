@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from config.redis import cached
+from config.redis import decorators
+
+
+def counting(value=None):
+    """
+    A slow function returning how many times it was called.
+    """
+    calls = []
+
+    async def compute(*args):
+        calls.append(args)
+        await asyncio.sleep(0.05)
+        return len(calls) if value is None else value
+
+    return compute, calls
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_computation(redis_client):
+    compute, calls = counting()
+    load = cached(ttl=10)(compute)
+
+    assert await asyncio.gather(*(load(1) for _ in range(20))) == [1] * 20
+    assert len(calls) == 1
+    assert await load(1) == 1
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_expired_result_is_served_while_refreshing(redis_client):
+    compute, calls = counting()
+    load = cached(ttl=0.1, stale_ttl=10, beta=0)(compute)
+
+    assert await load() == 1
+    await asyncio.sleep(0.15)
+    assert await asyncio.gather(*(load() for _ in range(5))) == [1] * 5
+
+    await asyncio.sleep(0.1)
+    assert await load() == 2
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_missing_result_waits_for_the_lock_holder_then_takes_over(redis_client):
+    compute, calls = counting('computed')
+    load = cached(ttl=10, lock_timeout=1)(compute)
+    # Another worker holds the lock and dies without storing a result
+    await redis_client.set(f'lock:{load.key_for()}', 'other', px=200)
+
+    assert await load() == 'computed'
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_methods_refresh_before_returning(redis_client):
+    compute, calls = counting()
+
+    class Service:
+        @cached(ttl=0.1, stale_ttl=10, beta=0, key='service')
+        async def load(self):
+            return await compute()
+
+    assert await Service().load() == 1
+    await asyncio.sleep(0.15)
+    assert await Service().load() == 2
+    assert not decorators._inflight
+
+
+def test_methods_need_a_key():
+    with pytest.raises(ValueError, match="'key' must be given"):
+        class Service:
+            @cached(ttl=10)
+            async def load(self):
+                pass
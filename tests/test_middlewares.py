@@ -0,0 +1,193 @@
+import asyncio
+
+import httpx
+import pytest
+import pytest_asyncio
+from fastapi import Depends, FastAPI, Request
+
+from config.middlewares import RequestDeadlineMiddleware, ResponseCacheMiddleware
+from config.redis import cache_response, invalidate_responses
+from config.redis.responses import pack_response, unpack_response
+from resources.depends import get_token_payload
+from utils.jwt import encode_jwt
+
+
+class Client:
+    """
+    Server side of one HTTP request: hands out `messages` as they are received, then waits for `disconnect_after`.
+    """
+
+    def __init__(self, messages, disconnect_after: float = None, headers=()):
+        self.messages = list(messages)
+        self.disconnect_after = disconnect_after
+        self.scope = {'type': 'http', 'method': 'POST', 'path': '/', 'headers': list(headers)}
+        self.received = 0
+        self.sent = []
+
+    async def receive(self):
+        self.received += 1
+        if self.messages:
+            return self.messages.pop(0)
+        if self.disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(self.disconnect_after)
+        return {'type': 'http.disconnect'}
+
+    async def send(self, message):
+        self.sent.append(message)
+
+
+async def respond(send, body: bytes = b'ok'):
+    await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+@pytest.mark.asyncio
+async def test_streamed_body_is_read_on_demand():
+    chunks = [{'type': 'http.request', 'body': bytes([index]) * 4, 'more_body': index < 2} for index in range(3)]
+    client = Client(chunks, headers=[(b'transfer-encoding', b'chunked')])
+    received_before_reads = []
+
+    async def app(scope, receive, send):
+        body = b''
+        while True:
+            received_before_reads.append(client.received)
+            message = await receive()
+            body += message['body']
+            if not message['more_body']:
+                break
+        await respond(send, body)
+
+    await RequestDeadlineMiddleware(app, seconds=5)(client.scope, client.receive, client.send)
+
+    # Nothing is read ahead of the handler
+    assert received_before_reads == [0, 1, 2]
+    assert client.sent[-1]['body'] == b'\x00' * 4 + b'\x01' * 4 + b'\x02' * 4
+
+
+@pytest.mark.asyncio
+async def test_deadline_answers_504():
+    client = Client([{'type': 'http.request', 'body': b'', 'more_body': False}])
+    cancelled = asyncio.Event()
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    await RequestDeadlineMiddleware(app, seconds=0.05)(client.scope, client.receive, client.send)
+
+    assert cancelled.is_set()
+    assert client.sent[0]['status'] == 504
+
+
+@pytest.mark.asyncio
+async def test_disconnect_cancels_the_handler():
+    client = Client([{'type': 'http.request', 'body': b'', 'more_body': False}], disconnect_after=0.05)
+    cancelled = asyncio.Event()
+
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    await asyncio.wait_for(RequestDeadlineMiddleware(app, seconds=0)(client.scope, client.receive, client.send), 1)
+
+    assert cancelled.is_set()
+    assert client.sent == []
+
+
+def test_packed_responses_round_trip():
+    entry = (200, [(b'content-type', b'application/json'), (b'x-empty', b'')], b'{"a": 1}', '"abc"')
+
+    assert unpack_response(pack_response(*entry)) == entry
+    with pytest.raises(ValueError, match='Malformed'):
+        unpack_response(pack_response(*entry)[:20])
+
+
+@pytest_asyncio.fixture
+async def cached_api(redis_client):
+    """
+    A client of an app with response-cached routes, and the number of times each route ran.
+    """
+    app = FastAPI()
+    app.add_middleware(ResponseCacheMiddleware)
+    calls = {'items': 0, 'mine': 0, 'secret': 0}
+
+    @app.get('/items')
+    @cache_response(ttl=60, vary=('accept-language',), tags=('items',))
+    async def items(request: Request):
+        calls['items'] += 1
+        return {'language': request.headers.get('accept-language')}
+
+    @app.get('/mine')
+    @cache_response(ttl=60, private=True)
+    async def mine(request: Request):
+        calls['mine'] += 1
+        return {'authorization': request.headers['authorization']}
+
+    @app.get('/secret', dependencies=[Depends(get_token_payload)])
+    @cache_response(ttl=60)
+    async def secret():
+        calls['secret'] += 1
+        return {}
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url='http://test') as client:
+        yield client, calls
+
+
+def bearer(user_id: int) -> dict:
+    return {'authorization': f'Bearer {encode_jwt({"id": user_id, "sub": "test"})}'}
+
+
+@pytest.mark.asyncio
+async def test_cached_response_hits_and_revalidates(cached_api):
+    client, calls = cached_api
+
+    miss = await client.get('/items')
+    hit = await client.get('/items')
+    assert (miss.headers['x-cache'], hit.headers['x-cache']) == ('MISS', 'HIT')
+    assert hit.json() == miss.json() and hit.headers['etag'] == miss.headers['etag']
+    assert hit.headers['content-type'] == 'application/json'
+    assert calls['items'] == 1
+
+    not_modified = await client.get('/items', headers={'if-none-match': miss.headers['etag']})
+    assert not_modified.status_code == 304 and not_modified.content == b''
+    assert calls['items'] == 1
+
+    await invalidate_responses('items')
+    assert (await client.get('/items')).headers['x-cache'] == 'MISS'
+    assert calls['items'] == 2
+
+
+@pytest.mark.asyncio
+async def test_vary_headers_and_users_get_their_own_responses(cached_api):
+    client, calls = cached_api
+
+    assert (await client.get('/items', headers={'accept-language': 'en'})).json() == {'language': 'en'}
+    assert (await client.get('/items', headers={'accept-language': 'uz'})).json() == {'language': 'uz'}
+    assert (await client.get('/items', headers={'accept-language': 'en'})).headers['x-cache'] == 'HIT'
+    assert calls['items'] == 2
+
+    first, second = bearer(1), bearer(2)
+    assert (await client.get('/mine', headers=first)).json() == first
+    assert (await client.get('/mine', headers=second)).json() == second
+    hit = await client.get('/mine', headers=first)
+    assert hit.headers['x-cache'] == 'HIT' and hit.json() == first
+    assert hit.headers['cache-control'].startswith('private')
+    assert calls['mine'] == 2
+
+
+@pytest.mark.asyncio
+async def test_routes_with_security_dependencies_are_not_shared(cached_api):
+    client, calls = cached_api
+
+    for _ in range(2):
+        response = await client.get('/secret', headers=bearer(1))
+        assert response.status_code == 200 and 'x-cache' not in response.headers
+    assert (await client.get('/secret')).status_code in (401, 403)
+    assert calls['secret'] == 2
@@ -0,0 +1,39 @@
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Mapped, mapped_column
+from sqlalchemy.schema import CreateTable
+
+from config.db import RangeByMonth
+from models import BaseModel
+
+
+class Reading(BaseModel):
+    __tablename__ = 'test_readings'
+    __partition__ = RangeByMonth('created_at')
+
+    value: Mapped[int] = mapped_column(sa.Integer())
+
+
+def test_postgresql_table_is_partitioned():
+    ddl = str(CreateTable(Reading.__table__).compile(dialect=postgresql.dialect()))
+
+    assert 'BIGSERIAL' in ddl
+    assert 'PRIMARY KEY (id, created_at)' in ddl
+    assert 'PARTITION BY RANGE (created_at)' in ddl
+
+
+def test_sqlite_table_is_plain():
+    ddl = str(CreateTable(Reading.__table__).compile(dialect=sqlite.dialect()))
+
+    assert 'id INTEGER NOT NULL PRIMARY KEY' in ddl
+    assert 'PRIMARY KEY (' not in ddl
+
+
+@pytest.mark.asyncio
+async def test_sqlite_assigns_ids(schema):
+    first = await Reading.repo.create({'value': 1})
+    second = await Reading.repo.create({'value': 2})
+
+    assert second.id == first.id + 1
+    assert (await Reading.repo.get(id=second.id)).value == 2
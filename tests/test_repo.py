@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+import sqlalchemy as sa
+from fastapi_pagination.cursor import CursorParams
+from sqlalchemy.orm import Mapped, mapped_column
+
+from config.db import DatabaseHelper, KeysetPage, batch_loading
+from models import Base, BaseModel, SoftDeleteMixin
+
+
+class Tag(BaseModel):
+    __tablename__ = 'test_tags'
+
+    name: Mapped[str] = mapped_column(sa.String(50), unique=True)
+    note: Mapped[str] = mapped_column(sa.String(100), nullable=True)
+
+
+class Coupon(SoftDeleteMixin, BaseModel):
+    __tablename__ = 'test_coupons'
+
+    code: Mapped[str] = mapped_column(sa.String(20), index=True)
+
+
+@pytest.mark.asyncio
+async def test_create_and_get(schema):
+    tag = await Tag.repo.create({'name': 'python'})
+
+    assert (await Tag.repo.get(id=tag.id)).name == 'python'
+    assert await Tag.repo.count() == 1
+    assert await Tag.repo.count(note=None) == 1
+    assert await Tag.repo.count(mode='cached') == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_get_or_create_creates_one_row(concurrent_schema):
+    results = await asyncio.gather(*(Tag.repo.get_or_create(name='k') for _ in range(50)))
+
+    assert sum(created for _, created in results) == 1
+    assert len({instance.id for instance, _ in results}) == 1
+    assert await Tag.repo.count(name='k') == 1
+
+
+@pytest.mark.asyncio
+async def test_get_or_create_requires_unique_lookup(schema):
+    with pytest.raises(ValueError, match='no unique constraint'):
+        await Tag.repo.get_or_create(note='k')
+
+
+@pytest.mark.asyncio
+async def test_session_writes_clear_batch_loaders(schema):
+    tag = await Tag.repo.create({'name': 'python'})
+
+    with batch_loading():
+        assert (await Tag.repo.load(tag.id)).note is None
+
+        async with schema.session() as session:
+            instance = await session.get(Tag, tag.id)
+            instance.note = 'flushed'
+            await session.commit()
+        assert (await Tag.repo.load(tag.id)).note == 'flushed'
+
+        async with schema.session() as session:
+            await session.execute(sa.update(Tag).where(Tag.id == tag.id).values(note='executed'))
+            await session.commit()
+        assert (await Tag.repo.load(tag.id)).note == 'executed'
+
+
+@pytest.mark.asyncio
+async def test_cursor_page_counts_only_for_pages_with_a_total(schema):
+    await Tag.repo.bulk_insert({'name': f'tag {index}'} for index in range(5))
+
+    first = await Tag.repo.cursor_page(KeysetPage[int].__params_type__(size=2))
+    assert len(first.items) == 2 and first.total is None
+    assert (await Tag.repo.cursor_page(CursorParams(size=2), count='exact')).total == 5
+
+    second = await Tag.repo.cursor_page(KeysetPage[int].__params_type__(size=2, cursor=first.next_page))
+    assert {tag.id for tag in second.items}.isdisjoint(tag.id for tag in first.items)
+
+
+@pytest.mark.asyncio
+async def test_hard_delete_purges_soft_deleted_rows(schema):
+    await Coupon.repo.create({'code': 'a'})
+    await Coupon.repo.create({'code': 'b'})
+    await Coupon.repo.delete(code='a')
+    await Coupon.repo.delete_where({'code': 'b'})
+    assert await Coupon.repo.count() == 0
+
+    await Coupon.repo.delete(code='a', hard=True)
+    assert await Coupon.repo.delete_where({'code': 'b'}, hard=True) == 1
+
+    async with schema.session() as session:
+        assert await session.scalar(sa.select(sa.func.count()).select_from(Coupon)) == 0
+
+
+@pytest.mark.asyncio
+async def test_session_writes_keep_reads_on_the_primary(tmp_path):
+    url = f'sqlite+aiosqlite:///{tmp_path / "test.db"}'
+    helper = DatabaseHelper(url, echo=False, replica_urls=[url], read_your_writes=60)
+    try:
+        await helper.create_schema(Base.metadata)
+        assert helper._choose_replica() is not None
+
+        async with helper.session() as session:
+            session.add(Tag(name='python'))
+            await session.commit()
+        assert helper._choose_replica() is None
+    finally:
+        await helper.engine.dispose()
+        await helper.replica_engines[0].dispose()
+
+
+@pytest.mark.asyncio
+@pytest.mark.filterwarnings('error::sqlalchemy.exc.SADeprecationWarning')
+async def test_filter_without_conditions(schema):
+    await Tag.repo.create({'name': 'python'})
+
+    assert [tag.name for tag in await Tag.repo.filter()] == ['python']